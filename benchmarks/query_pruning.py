@@ -0,0 +1,186 @@
+"""Latency and recall of query token pruning.
+
+By default, the pages of the test-asset paper are embedded with a local ColPali
+model into an in-memory Qdrant index, and a fixed list of questions whose
+answer is on a known page is searched through `Qdrant.search` once per pruning
+setting: the full query, "skip special tokens" (BOS and <pad> augmentation
+tokens removed, while the "Query: " prompt and trailing newline tokens stay)
+and several `token_budget`s on top of that. Each setting
+reports the mean search latency, recall against the answer page, and how
+much of the full query's top-k it keeps.
+
+    poetry run python benchmarks/query_pruning.py
+
+`--synthetic` runs the same comparison without a model, on random page and
+query vectors scored with an exhaustive numpy MaxSim. Its augmentation tokens
+are noise around a single vector, which is exactly what the saliency heuristic
+assumes, so it only shows how latency scales with the number of query tokens
+and is an upper bound on recall.
+
+    poetry run python benchmarks/query_pruning.py --synthetic
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from midrasai._pruning import prune_query
+
+PDF = "./tests/assets/Attention_is_all_you_need.pdf"
+INDEX = "query_pruning"
+QUANTITY = 5
+REPEATS = 5
+TOKEN_BUDGETS = [8, 4, 2]
+
+# (question, page that answers it)
+QUESTIONS = [
+    ("Who are the authors of the Transformer paper?", 1),
+    ("Why do recurrent models prevent parallelization within training examples?", 2),
+    ("What does the diagram of the Transformer model architecture show?", 3),
+    ("How is scaled dot-product attention computed?", 4),
+    ("What is the inner dimension of the position-wise feed-forward network?", 5),
+    ("How are the sinusoidal positional encodings defined?", 6),
+    ("How does the per-layer complexity of self-attention compare to recurrence?", 6),
+    ("Which GPUs were the models trained on and for how long?", 7),
+    ("What learning rate schedule was used with the Adam optimizer?", 7),
+    ("How much label smoothing and dropout was used during training?", 7),
+    ("What BLEU score does the big model reach on English-to-German?", 8),
+    ("How does the number of attention heads affect translation quality?", 9),
+    ("What F1 score does the Transformer get on WSJ constituency parsing?", 10),
+    ("What future work do the authors plan for attention-based models?", 10),
+    ("Which attention heads follow long-distance dependencies of 'making'?", 13),
+    ("Which attention heads appear to be involved in anaphora resolution?", 14),
+]
+
+# Synthetic evaluation set
+SEED = 0
+DIM = 128
+PAGES = 100
+PAGE_TOKENS = 1030
+QUERIES = 50
+CONTENT_TOKENS = 8
+PROMPT_TOKENS = 4
+AUGMENTATION_TOKENS = 10
+NOISE = 0.2
+
+
+def report(variants: dict, search, targets: list[int]):
+    print(
+        f"{'variant':<22}{'tokens':>8}{'ms/query':>10}{'speedup':>9}"
+        f"{'recall@1':>10}{'recall@5':>10}{'top-5 overlap':>15}"
+    )
+
+    baseline_latency, baseline = 0.0, []
+    for name, query_vectors in variants.items():
+        latency, rankings = timed(search, query_vectors)
+        if not baseline:
+            baseline_latency, baseline = latency, rankings
+
+        tokens = np.mean([len(query_vector) for query_vector in query_vectors])
+        recall_1 = np.mean([r[0] == t for r, t in zip(rankings, targets)])
+        recall_5 = np.mean([t in r for r, t in zip(rankings, targets)])
+        overlap = np.mean(
+            [len(set(a) & set(b)) / QUANTITY for a, b in zip(rankings, baseline)]
+        )
+        print(
+            f"{name:<22}{tokens:>8.1f}{latency * 1000:>10.2f}"
+            f"{baseline_latency / latency:>9.2f}{recall_1:>10.2f}{recall_5:>10.2f}"
+            f"{overlap:>15.2f}"
+        )
+
+
+def timed(search, query_vectors) -> tuple[float, list[list[int]]]:
+    rankings = []
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        rankings = [search(query_vector) for query_vector in query_vectors]
+        best = min(best, time.perf_counter() - start)
+
+    return best / len(query_vectors), rankings
+
+
+def pruned(query_vectors, token_budget: int):
+    return [prune_query(query_vector, token_budget) for query_vector in query_vectors]
+
+
+def main():
+    from midrasai.local import LocalMidras
+
+    midras = LocalMidras()
+    midras.create_index(INDEX)
+
+    pages = midras.embed_pdf(PDF, batch_size="auto").embeddings
+    midras.index.save_points(
+        INDEX,
+        [
+            midras.index.create_point(id=page, embedding=embedding, data={})
+            for page, embedding in enumerate(pages, 1)
+        ],
+    )
+
+    questions = [question for question, _ in QUESTIONS]
+    skip_special = midras.embed_queries(questions, skip_special_tokens=True)
+    variants = {
+        "full": midras.embed_queries(questions).embeddings,
+        "skip special tokens": skip_special.embeddings,
+        **{
+            f"token_budget={budget}": pruned(skip_special.embeddings, budget)
+            for budget in TOKEN_BUDGETS
+        },
+    }
+
+    def search(query_vector) -> list[int]:
+        results = midras.index.search(INDEX, query_vector, QUANTITY)
+        return [int(result.id) for result in results]
+
+    print(f"{len(pages)} pages of {PDF}, {len(questions)} questions")
+    report(variants, search, [page for _, page in QUESTIONS])
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+
+
+def main_synthetic():
+    rng = np.random.default_rng(SEED)
+    pages = normalize(rng.standard_normal((PAGES, PAGE_TOKENS, DIM), dtype=np.float32))
+    prompt = normalize(rng.standard_normal((PROMPT_TOKENS, DIM), dtype=np.float32))
+    pad = normalize(rng.standard_normal(DIM, dtype=np.float32))
+
+    targets, full, skip_special = [], [], []
+    for target in rng.choice(PAGES, size=QUERIES, replace=False):
+        picked = rng.choice(PAGE_TOKENS, size=CONTENT_TOKENS, replace=False)
+        noise = rng.standard_normal((CONTENT_TOKENS, DIM), dtype=np.float32)
+        content = normalize(pages[target, picked] + NOISE * noise)
+        noise = rng.standard_normal((AUGMENTATION_TOKENS, DIM), dtype=np.float32)
+        augmentation = normalize(pad + 0.02 * noise)
+
+        targets.append(int(target))
+        full.append(np.concatenate([prompt, content, augmentation]).tolist())
+        skip_special.append(np.concatenate([prompt, content]).tolist())
+
+    variants = {
+        "full": full,
+        "skip special tokens": skip_special,
+        **{
+            f"token_budget={budget}": pruned(skip_special, budget)
+            for budget in TOKEN_BUDGETS
+        },
+    }
+
+    def search(query_vector) -> list[int]:
+        query = np.asarray(query_vector, dtype=np.float32)
+        scores = (pages @ query.T).max(axis=1).sum(axis=1)
+        return np.argsort(-scores)[:QUANTITY].tolist()
+
+    print(f"Synthetic: {PAGES} pages, {QUERIES} queries (exhaustive numpy MaxSim)")
+    report(variants, search, targets)
+
+
+if __name__ == "__main__":
+    if "--synthetic" in sys.argv[1:]:
+        main_synthetic()
+    else:
+        main()
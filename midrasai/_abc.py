@@ -1,17 +1,33 @@
+import asyncio
+import warnings
 from abc import ABC, abstractmethod
 from base64 import b64encode
+from concurrent.futures import ThreadPoolExecutor, wait
 from io import BytesIO
-from typing import Any, Awaitable
+from typing import Any, AsyncIterator, Awaitable, Iterator
 
-from midrasai.types import ColBERT, MidrasResponse, Mode, QueryResult
+from midrasai.types import BatchSize, ColBERT, MidrasResponse, Mode, QueryResult
 
 
 class BaseMidras(ABC):
     @abstractmethod
     def embed_pdf(
-        self, pdf: str | bytes, batch_size: int = 10, include_images: bool = False
+        self,
+        pdf: str | bytes,
+        batch_size: BatchSize = 10,
+        include_images: bool = False,
+        lazy_images: bool = False,
     ) -> MidrasResponse: ...
 
+    @abstractmethod
+    def iter_embed_pdf(
+        self,
+        pdf: str | bytes,
+        batch_size: BatchSize = 10,
+        include_images: bool = False,
+        lazy_images: bool = False,
+    ) -> Iterator[MidrasResponse]: ...
+
     @abstractmethod
     def embed_images(
         self, images: list, mode: Mode = Mode.Standard
@@ -19,11 +35,16 @@ class BaseMidras(ABC):
 
     @abstractmethod
     def embed_queries(
-        self, queries: list[str], mode: Mode = Mode.Standard
+        self,
+        queries: list[str],
+        mode: Mode = Mode.Standard,
+        skip_special_tokens: bool = False,
     ) -> MidrasResponse: ...
 
     @abstractmethod
-    def create_index(self, name: str) -> bool | Awaitable[bool]: ...
+    def create_index(
+        self, name: str, profile: str | None = None, **overrides: Any
+    ) -> bool | Awaitable[bool]: ...
 
     @abstractmethod
     def add_point(
@@ -31,7 +52,15 @@ class BaseMidras(ABC):
     ) -> Any: ...
 
     @abstractmethod
-    def query(self, index: str, query: str, quantity: int = 5) -> list[QueryResult]: ...
+    def query(
+        self,
+        index: str | list[str],
+        query: str,
+        quantity: int = 5,
+        timeout: float | None = None,
+        prune_tokens: bool = False,
+        token_budget: int | None = None,
+    ) -> list[QueryResult]: ...
 
     def base64_encode_image_list(self, pil_images: list) -> list[str]:
         base64_images = []
@@ -46,9 +75,22 @@ class BaseMidras(ABC):
 class AsyncBaseMidras(ABC):
     @abstractmethod
     async def embed_pdf(
-        self, pdf: str | bytes, batch_size: int = 10, include_images: bool = False
+        self,
+        pdf: str | bytes,
+        batch_size: BatchSize = 10,
+        include_images: bool = False,
+        lazy_images: bool = False,
     ) -> MidrasResponse: ...
 
+    @abstractmethod
+    def iter_embed_pdf(
+        self,
+        pdf: str | bytes,
+        batch_size: BatchSize = 10,
+        include_images: bool = False,
+        lazy_images: bool = False,
+    ) -> AsyncIterator[MidrasResponse]: ...
+
     @abstractmethod
     async def embed_images(
         self, images: list, mode: Mode = Mode.Standard
@@ -56,11 +98,16 @@ class AsyncBaseMidras(ABC):
 
     @abstractmethod
     async def embed_queries(
-        self, queries: list[str], mode: Mode = Mode.Standard
+        self,
+        queries: list[str],
+        mode: Mode = Mode.Standard,
+        skip_special_tokens: bool = False,
     ) -> MidrasResponse: ...
 
     @abstractmethod
-    async def create_index(self, name: str) -> bool | Awaitable[bool]: ...
+    async def create_index(
+        self, name: str, profile: str | None = None, **overrides: Any
+    ) -> bool | Awaitable[bool]: ...
 
     @abstractmethod
     async def add_point(
@@ -69,7 +116,13 @@ class AsyncBaseMidras(ABC):
 
     @abstractmethod
     async def query(
-        self, index: str, query: str, quantity: int = 5
+        self,
+        index: str | list[str],
+        query: str,
+        quantity: int = 5,
+        timeout: float | None = None,
+        prune_tokens: bool = False,
+        token_budget: int | None = None,
     ) -> list[QueryResult]: ...
 
     def base64_encode_image_list(self, pil_images: list) -> list[str]:
@@ -84,7 +137,14 @@ class AsyncBaseMidras(ABC):
 
 class VectorDB(ABC):
     @abstractmethod
-    def create_index(self, name: str) -> bool: ...
+    def create_index(
+        self, name: str, profile: str | None = None, **overrides: Any
+    ) -> bool: ...
+
+    @abstractmethod
+    def update_index(
+        self, name: str, profile: str | None = None, **overrides: Any
+    ) -> bool: ...
 
     @abstractmethod
     def create_point(
@@ -94,18 +154,78 @@ class VectorDB(ABC):
     @abstractmethod
     def save_points(self, index: str, points: list[Any]) -> Any: ...
 
+    @abstractmethod
+    def index_exists(self, name: str) -> bool: ...
+
     @abstractmethod
     def delete_index(self, name: str) -> bool: ...
 
+    @abstractmethod
+    def export_index(self, index: str, path: str, batch_size: int = 256) -> int: ...
+
+    @abstractmethod
+    def import_index(
+        self,
+        index: str,
+        path: str,
+        batch_size: int = 256,
+        parallel: int = 4,
+        profile: str | None = None,
+        **overrides: Any,
+    ) -> int: ...
+
     @abstractmethod
     def search(
-        self, index: str, query_vector: ColBERT, quantity: int
+        self,
+        index: str,
+        query_vector: ColBERT,
+        quantity: int,
+        hnsw_ef: int | None = None,
+        exact: bool = False,
     ) -> list[QueryResult]: ...
 
+    def search_many(
+        self,
+        indexes: list[str],
+        query_vector: ColBERT,
+        quantity: int,
+        timeout: float | None = None,
+        hnsw_ef: int | None = None,
+        exact: bool = False,
+    ) -> list[QueryResult]:
+        if not indexes:
+            return []
+
+        executor = ThreadPoolExecutor(max_workers=len(indexes))
+        futures = {
+            executor.submit(
+                self.search, index, query_vector, quantity, hnsw_ef, exact
+            ): index
+            for index in indexes
+        }
+        done, not_done = wait(futures, timeout=timeout)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+        shards: dict[str, list[QueryResult] | BaseException | None] = {}
+        for future, index in futures.items():
+            if future in not_done:
+                warnings.warn(f"Search on index '{index}' timed out.")
+                shards[index] = None
+            else:
+                shards[index] = future.exception() or future.result()
+        return gather_shards(shards, quantity)
+
 
 class AsyncVectorDB(ABC):
     @abstractmethod
-    async def create_index(self, name: str) -> bool: ...
+    async def create_index(
+        self, name: str, profile: str | None = None, **overrides: Any
+    ) -> bool: ...
+
+    @abstractmethod
+    async def update_index(
+        self, name: str, profile: str | None = None, **overrides: Any
+    ) -> bool: ...
 
     @abstractmethod
     async def create_point(
@@ -115,10 +235,85 @@ class AsyncVectorDB(ABC):
     @abstractmethod
     async def save_points(self, index: str, points: list[Any]) -> Any: ...
 
+    @abstractmethod
+    async def index_exists(self, name: str) -> bool: ...
+
     @abstractmethod
     async def delete_index(self, name: str) -> bool: ...
 
+    @abstractmethod
+    async def export_index(
+        self, index: str, path: str, batch_size: int = 256
+    ) -> int: ...
+
+    @abstractmethod
+    async def import_index(
+        self,
+        index: str,
+        path: str,
+        batch_size: int = 256,
+        parallel: int = 4,
+        profile: str | None = None,
+        **overrides: Any,
+    ) -> int: ...
+
     @abstractmethod
     async def search(
-        self, index: str, query_vector: ColBERT, quantity: int
+        self,
+        index: str,
+        query_vector: ColBERT,
+        quantity: int,
+        hnsw_ef: int | None = None,
+        exact: bool = False,
     ) -> list[QueryResult]: ...
+
+    async def search_many(
+        self,
+        indexes: list[str],
+        query_vector: ColBERT,
+        quantity: int,
+        timeout: float | None = None,
+        hnsw_ef: int | None = None,
+        exact: bool = False,
+    ) -> list[QueryResult]:
+        if not indexes:
+            return []
+
+        async def search_shard(index: str) -> list[QueryResult] | Exception | None:
+            try:
+                return await asyncio.wait_for(
+                    self.search(index, query_vector, quantity, hnsw_ef, exact),
+                    timeout,
+                )
+            except asyncio.TimeoutError:
+                warnings.warn(f"Search on index '{index}' timed out.")
+                return None
+            except Exception as e:
+                return e
+
+        shards = await asyncio.gather(*(search_shard(index) for index in indexes))
+        return gather_shards(dict(zip(indexes, shards)), quantity)
+
+
+def gather_shards(
+    shards: dict[str, list[QueryResult] | BaseException | None], quantity: int
+) -> list[QueryResult]:
+    # Failed shards are skipped like timed out (None) ones, unless all failed
+    errors = {i: s for i, s in shards.items() if isinstance(s, BaseException)}
+    if len(errors) == len(shards):
+        raise next(iter(errors.values()))
+
+    for index, error in errors.items():
+        warnings.warn(f"Search on index '{index}' failed: {error!r}")
+
+    results = [
+        result
+        for shard in shards.values()
+        if isinstance(shard, list)
+        for result in shard
+    ]
+    return merge_results(results, quantity)
+
+
+def merge_results(results: list[QueryResult], quantity: int) -> list[QueryResult]:
+    return sorted(results, key=lambda result: result.score, reverse=True)[:quantity]
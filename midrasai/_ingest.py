@@ -0,0 +1,181 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from itertools import islice
+from threading import Lock
+from typing import Any, Callable
+from uuid import NAMESPACE_URL, uuid5
+
+from pydantic import BaseModel
+
+from midrasai.types import BatchSize
+
+
+class DocumentResult(BaseModel):
+    path: str
+    pages: int = 0
+    seconds: float = 0.0
+    error: str | None = None
+
+
+class IngestReport(BaseModel):
+    documents: list[DocumentResult]
+    skipped: int
+    seconds: float
+
+    @property
+    def pages(self) -> int:
+        return sum(document.pages for document in self.documents)
+
+    @property
+    def failures(self) -> list[DocumentResult]:
+        return [document for document in self.documents if document.error]
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.pages / self.seconds if self.seconds else 0.0
+
+
+class Checkpoint:
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = Lock()
+        self.done: set[str] = set()
+
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        result = DocumentResult.model_validate_json(line)
+                        if result.error is None:
+                            self.done.add(result.path)
+
+    def record(self, result: DocumentResult):
+        with self.lock, open(self.path, "a") as f:
+            f.write(result.model_dump_json() + "\n")
+            if result.error is None:
+                self.done.add(result.path)
+
+
+def find_pdfs(source: str) -> list[str]:
+    if os.path.isdir(source):
+        return sorted(
+            os.path.abspath(os.path.join(root, name))
+            for root, _, names in os.walk(source)
+            for name in names
+            if name.lower().endswith(".pdf")
+        )
+
+    # Manifest file with one pdf path per line, relative to the manifest
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source) as f:
+        lines = [line.strip() for line in f]
+    return [
+        os.path.abspath(os.path.join(base, line))
+        for line in lines
+        if line and not line.startswith("#")
+    ]
+
+
+def point_id(path: str, page: int) -> str:
+    return str(uuid5(NAMESPACE_URL, f"{path}#{page}"))
+
+
+def ingest_document(
+    midras: Any,
+    path: str,
+    index: str,
+    batch_size: BatchSize,
+    upsert_batch_size: int,
+) -> DocumentResult:
+    start = time.perf_counter()
+    page = 0
+    points = []
+
+    try:
+        for response in midras.iter_embed_pdf(path, batch_size):
+            for embedding in response.embeddings:
+                page += 1
+                points.append(
+                    midras.index.create_point(
+                        id=point_id(path, page),
+                        embedding=embedding,
+                        data={"source": path, "page": page},
+                    )
+                )
+                if len(points) >= upsert_batch_size:
+                    midras.index.save_points(index, points)
+                    points = []
+        if points:
+            midras.index.save_points(index, points)
+    except Exception as e:
+        return DocumentResult(
+            path=path,
+            pages=page,
+            seconds=time.perf_counter() - start,
+            error=f"{type(e).__name__}: {e}",
+        )
+
+    return DocumentResult(path=path, pages=page, seconds=time.perf_counter() - start)
+
+
+def ingest(
+    midras: Any,
+    paths: list[str],
+    index: str,
+    checkpoint: str,
+    workers: int = 4,
+    batch_size: BatchSize = 10,
+    upsert_batch_size: int = 64,
+    on_document: Callable[[DocumentResult], None] | None = None,
+) -> IngestReport:
+    progress = Checkpoint(checkpoint)
+    pending = [path for path in paths if path not in progress.done]
+
+    start = time.perf_counter()
+    documents = []
+
+    def record(future: Future[DocumentResult]):
+        result = future.result()
+        progress.record(result)
+        documents.append(result)
+        if on_document is not None:
+            on_document(result)
+
+    # Only a bounded window of documents is queued, so an interrupted run
+    # stops after the documents in flight instead of draining the corpus
+    queue = iter(pending)
+    executor = ThreadPoolExecutor(max_workers=workers)
+    running: set[Future[DocumentResult]] = set()
+
+    def submit(count: int):
+        for path in islice(queue, count):
+            running.add(
+                executor.submit(
+                    ingest_document, midras, path, index, batch_size, upsert_batch_size
+                )
+            )
+
+    try:
+        submit(2 * workers)
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                running.remove(future)
+                record(future)
+            submit(len(done))
+    except BaseException:
+        # Let the documents in flight finish and checkpoint them before leaving
+        executor.shutdown(wait=True, cancel_futures=True)
+        for future in running:
+            if not future.cancelled():
+                progress.record(future.result())
+        raise
+    finally:
+        executor.shutdown(wait=True)
+
+    return IngestReport(
+        documents=documents,
+        skipped=len(paths) - len(pending),
+        seconds=time.perf_counter() - start,
+    )
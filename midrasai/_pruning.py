@@ -0,0 +1,24 @@
+import numpy as np
+
+from midrasai.types import ColBERT
+
+
+def prune_query(embedding: ColBERT, token_budget: int) -> ColBERT:
+    if token_budget < 1:
+        raise ValueError("token_budget must be at least 1")
+    if token_budget >= len(embedding):
+        return embedding
+
+    tokens = np.asarray(embedding, dtype=np.float32)
+    norms = np.linalg.norm(tokens, axis=1)
+    unit = tokens / np.maximum(norms, 1e-12)[:, None]
+
+    # Tokens far from the query centroid carry the most distinctive content,
+    # while filler tokens (augmentation, prompt) cluster around it
+    centroid = unit.mean(axis=0)
+    centroid /= max(float(np.linalg.norm(centroid)), 1e-12)
+    saliency = 1.0 - unit @ centroid
+    saliency[norms == 0] = -np.inf
+
+    keep = np.sort(np.argsort(-saliency, kind="stable")[:token_budget])
+    return [embedding[i] for i in keep]
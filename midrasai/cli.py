@@ -1,19 +1,139 @@
+import os
 import warnings
 
+import typer
 
-def cli(host: str = "127.0.0.1", port: int = 8000):
+from midrasai._ingest import find_pdfs, ingest
+from midrasai.types import BatchSize
+from midrasai.vectordb import Qdrant
+
+
+def cli(
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    max_upload_mb: int = 256,
+    page_memory_mb: int = 2048,
+    query_cache_mb: int = 64,
+    image_cache_mb: int = 256,
+):
     try:
         import uvicorn
 
-        from midrasai.local.server import app
+        from midrasai.local import server
+        from midrasai.local._cache import EmbeddingCache
+        from midrasai.local._memory import MemoryBudget
+
+        server.max_upload_bytes = max_upload_mb * 1024**2
+        server.page_memory = MemoryBudget(page_memory_mb * 1024**2)
+        server.query_cache = EmbeddingCache(query_cache_mb * 1024**2)
+        server.image_cache = EmbeddingCache(image_cache_mb * 1024**2)
 
-        uvicorn.run(app, host=host, port=port)
+        uvicorn.run(server.app, host=host, port=port)
 
     except ImportError:
         warnings.warn("Local extra dependencies not installed. Server unavailable.")
 
 
-if __name__ == "__main__":
-    import typer
+def server_cli():
+    typer.run(cli)
+
+
+def parse_batch_size(batch_size: str) -> BatchSize:
+    if batch_size == "auto":
+        return "auto"
+    if not batch_size.isdigit() or int(batch_size) < 1:
+        raise typer.BadParameter(
+            "Must be a positive integer or 'auto'", param_hint="--batch-size"
+        )
+    return int(batch_size)
+
+
+def ingest_command(
+    source: str,
+    index: str,
+    qdrant_url: str | None = None,
+    qdrant_path: str | None = None,
+    base_url: str | None = None,
+    api_key: str = "",
+    checkpoint: str | None = None,
+    workers: int = 4,
+    batch_size: str = "10",
+    upsert_batch_size: int = 64,
+    profile: str | None = None,
+):
+    """Embed a directory (or manifest file) of pdfs into an index.
+
+    Uses the midras servers in --base-url (comma separated) when given, and a
+    local ColPali model otherwise. Finished documents are recorded in the
+    checkpoint file, so an interrupted run can be resumed by running it again.
+    With a local model, --workers overlap rasterizing and upserts while forward
+    passes run one at a time.
+    """
+    if qdrant_url is None and qdrant_path is None:
+        raise typer.BadParameter("Pass --qdrant-url or --qdrant-path")
+    parsed_batch_size = parse_batch_size(batch_size)
+
+    # Workers upsert from their own threads
+    vector_database = Qdrant(
+        url=qdrant_url, path=qdrant_path, force_disable_check_same_thread=True
+    )
+    if base_url is not None:
+        from midrasai.client import Midras
+
+        midras = Midras(
+            api_key, vector_database=vector_database, base_url=base_url.split(",")
+        )
+    else:
+        try:
+            from midrasai.local import LocalMidras
+        except ImportError:
+            raise typer.BadParameter(
+                "Local extra dependencies not installed. Pass --base-url."
+            )
 
+        midras = LocalMidras(vector_database=vector_database)
+
+    if not vector_database.index_exists(index):
+        vector_database.create_index(index, profile)
+
+    paths = find_pdfs(source)
+    if checkpoint is None:
+        checkpoint = f"{os.path.abspath(source).rstrip(os.sep)}.{index}.checkpoint"
+
+    def report(result):
+        if result.error:
+            typer.echo(f"FAILED {result.path}: {result.error}", err=True)
+        else:
+            rate = result.pages / result.seconds if result.seconds else 0.0
+            typer.echo(f"{result.path}: {result.pages} pages ({rate:.2f} pages/sec)")
+
+    result = ingest(
+        midras,
+        paths,
+        index,
+        checkpoint,
+        workers=workers,
+        batch_size=parsed_batch_size,
+        upsert_batch_size=upsert_batch_size,
+        on_document=report,
+    )
+
+    typer.echo(
+        f"Ingested {len(result.documents) - len(result.failures)} documents "
+        f"({result.pages} pages) in {result.seconds:.1f}s, "
+        f"{result.pages_per_second:.2f} pages/sec. "
+        f"Skipped {result.skipped} already ingested, {len(result.failures)} failed."
+    )
+    for failure in result.failures:
+        typer.echo(f"  {failure.path}: {failure.error}", err=True)
+
+    if result.failures:
+        raise typer.Exit(code=1)
+
+
+def ingest_cli():
+    typer.run(ingest_command)
+
+
+if __name__ == "__main__":
     typer.run(cli)
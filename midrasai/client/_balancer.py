@@ -0,0 +1,103 @@
+import threading
+import time
+from typing import Iterable
+
+import httpx
+
+# Weight of the newest sample in each endpoint's latency moving average
+LATENCY_DECAY = 0.2
+
+
+class Endpoint:
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.outstanding = 0
+        self.latency = 0.0
+        self.failures = 0
+        self.ejected = False
+
+    @property
+    def load(self) -> float:
+        return self.latency * (self.outstanding + 1)
+
+    def __repr__(self) -> str:
+        return f"Endpoint(url={self.url!r}, outstanding={self.outstanding}, ejected={self.ejected})"
+
+
+class EndpointPool:
+    def __init__(
+        self,
+        urls: Iterable[str],
+        failure_threshold: int = 3,
+        probe_interval: float = 10.0,
+    ):
+        self.endpoints = [Endpoint(url) for url in urls]
+        if not self.endpoints:
+            raise ValueError("At least one endpoint is required")
+
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self.lock = threading.Lock()
+        self.prober: threading.Thread | None = None
+
+    def __len__(self) -> int:
+        return len(self.endpoints)
+
+    def select(self, exclude: Iterable[Endpoint] = ()) -> Endpoint | None:
+        with self.lock:
+            candidates = [e for e in self.endpoints if e not in exclude]
+            # Fall back to ejected endpoints rather than failing outright
+            healthy = [e for e in candidates if not e.ejected] or candidates
+            if not healthy:
+                return None
+            return min(healthy, key=lambda e: (e.load, e.outstanding))
+
+    def acquire(self, endpoint: Endpoint):
+        with self.lock:
+            endpoint.outstanding += 1
+
+    def release(self, endpoint: Endpoint, ok: bool | None, latency: float):
+        with self.lock:
+            endpoint.outstanding -= 1
+            if ok is None:
+                return
+
+            if ok:
+                endpoint.failures = 0
+                if endpoint.latency == 0.0:
+                    endpoint.latency = latency
+                else:
+                    endpoint.latency += LATENCY_DECAY * (latency - endpoint.latency)
+                return
+
+            endpoint.failures += 1
+            if endpoint.failures >= self.failure_threshold and not endpoint.ejected:
+                endpoint.ejected = True
+                self.start_prober()
+
+    def start_prober(self):
+        if self.prober is None or not self.prober.is_alive():
+            self.prober = threading.Thread(target=self.probe, daemon=True)
+            self.prober.start()
+
+    def probe(self):
+        with httpx.Client(timeout=self.probe_interval) as client:
+            while True:
+                time.sleep(self.probe_interval)
+
+                with self.lock:
+                    ejected = [e for e in self.endpoints if e.ejected]
+                    if not ejected:
+                        self.prober = None
+                        return
+
+                for endpoint in ejected:
+                    try:
+                        alive = client.get(f"{endpoint.url}/health").status_code < 500
+                    except httpx.HTTPError:
+                        alive = False
+
+                    if alive:
+                        with self.lock:
+                            endpoint.ejected = False
+                            endpoint.failures = 0
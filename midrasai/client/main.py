@@ -1,31 +1,110 @@
-from typing import Any
+import asyncio
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, AsyncIterator, Iterator, cast
 
 import httpx
 
 from midrasai._abc import (
     AsyncBaseMidras,
+    AsyncVectorDB,
     BaseMidras,
     VectorDB,
 )
 from midrasai._constants import CLOUD_URL
-from midrasai.types import ColBERT, MidrasResponse, Mode
+from midrasai._pruning import prune_query
+from midrasai.client._balancer import Endpoint, EndpointPool
+from midrasai.types import BatchSize, ColBERT, MidrasResponse, Mode, PageImage
 from midrasai.vectordb import Qdrant
 
 
+def endpoint_urls(base_url: str | list[str] | None) -> list[str]:
+    if base_url is None:
+        return [CLOUD_URL]
+    if isinstance(base_url, str):
+        return [base_url]
+    return base_url
+
+
 class Midras(BaseMidras):
     def __init__(
         self,
         api_key: str,
         *,
         vector_database: VectorDB | None = None,
-        base_url: str | None = None,
+        base_url: str | list[str] | None = None,
+        hedge_after: float | None = None,
+        failure_threshold: int = 3,
+        probe_interval: float = 10.0,
     ):
         self.api_key = api_key
-        self.client = httpx.Client(base_url=CLOUD_URL if base_url is None else base_url)
+        self.client = httpx.Client()
+        self.endpoints = EndpointPool(
+            endpoint_urls(base_url), failure_threshold, probe_interval
+        )
+        self.hedge_after = hedge_after
+        self.executor = ThreadPoolExecutor() if hedge_after is not None else None
         self.index = vector_database if vector_database else Qdrant(location=":memory:")
 
+    def _post(self, path: str, **kwargs: Any) -> httpx.Response:
+        tried: list[Endpoint] = []
+        while True:
+            endpoint = cast(Endpoint, self.endpoints.select(exclude=tried))
+            tried.append(endpoint)
+            try:
+                response = self._hedge(endpoint, tried, path, kwargs)
+            except httpx.TransportError:
+                if len(tried) >= len(self.endpoints):
+                    raise
+                continue
+
+            if response.status_code < 500 or len(tried) >= len(self.endpoints):
+                return response
+
+    def _hedge(
+        self, endpoint: Endpoint, tried: list[Endpoint], path: str, kwargs: dict
+    ) -> httpx.Response:
+        if self.executor is None:
+            return self._send(endpoint, path, kwargs)
+
+        primary = self.executor.submit(self._send, endpoint, path, kwargs)
+        done, _ = wait([primary], timeout=self.hedge_after)
+        backup_endpoint = None if done else self.endpoints.select(exclude=tried)
+        if backup_endpoint is None:
+            return primary.result()
+
+        tried.append(backup_endpoint)
+        backup = self.executor.submit(self._send, backup_endpoint, path, kwargs)
+        done, _ = wait([primary, backup], return_when=FIRST_COMPLETED)
+        first = done.pop()
+        if first.exception() is None and first.result().status_code < 500:
+            return first.result()
+        return (backup if first is primary else primary).result()
+
+    def _send(self, endpoint: Endpoint, path: str, kwargs: dict) -> httpx.Response:
+        self.endpoints.acquire(endpoint)
+        start = time.monotonic()
+        ok = None
+        try:
+            response = self.client.post(
+                f"{endpoint.url}{path}",
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                **kwargs,
+            )
+            ok = response.status_code < 500
+            return response
+        except httpx.TransportError:
+            ok = False
+            raise
+        finally:
+            self.endpoints.release(endpoint, ok, time.monotonic() - start)
+
     def embed_pdf(
-        self, pdf: str | bytes, batch_size: int = 10, include_images: bool = False
+        self,
+        pdf: str | bytes,
+        batch_size: BatchSize = 10,
+        include_images: bool = False,
+        lazy_images: bool = False,
     ) -> MidrasResponse:
         if isinstance(pdf, str):
             with open(pdf, "rb") as f:
@@ -34,25 +113,88 @@ class Midras(BaseMidras):
             file_data = pdf
 
         files = {"file": ("test.pdf", file_data, "application/pdf")}
-        response = self.client.post(
+        response = self._post(
             "/embed/pdf",
             files=files,
-            headers={"Authorization": f"Bearer {self.api_key}"},
-            params={"batch_size": batch_size, "include_images": include_images},
+            params={
+                "batch_size": batch_size,
+                "include_images": include_images and not lazy_images,
+            },
         )
 
         if response.status_code == 200:
-            return MidrasResponse.model_validate(response.json())
+            result = MidrasResponse.model_validate(response.json())
+            if include_images and lazy_images:
+                result.images = [
+                    PageImage(pdf, page)
+                    for page in range(1, len(result.embeddings) + 1)
+                ]
+            return result
         else:
             raise ValueError("Internal server error")
 
+    def iter_embed_pdf(
+        self,
+        pdf: str | bytes,
+        batch_size: BatchSize = 10,
+        include_images: bool = False,
+        lazy_images: bool = False,
+    ) -> Iterator[MidrasResponse]:
+        if isinstance(pdf, str):
+            with open(pdf, "rb") as f:
+                file_data = f.read()
+        elif isinstance(pdf, bytes):
+            file_data = pdf
+
+        files = {"file": ("test.pdf", file_data, "application/pdf")}
+        endpoint = cast(Endpoint, self.endpoints.select())
+        self.endpoints.acquire(endpoint)
+        start = time.monotonic()
+        ok, elapsed = None, None
+        try:
+            with self.client.stream(
+                "POST",
+                f"{endpoint.url}/embed/pdf",
+                files=files,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                params={
+                    "batch_size": batch_size,
+                    "include_images": include_images and not lazy_images,
+                    "stream": True,
+                },
+            ) as response:
+                ok = response.status_code < 500
+                elapsed = time.monotonic() - start
+                if response.status_code != 200:
+                    raise ValueError("Internal server error")
+
+                page = 1
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+
+                    result = MidrasResponse.model_validate_json(line)
+                    if include_images and lazy_images:
+                        result.images = [
+                            PageImage(pdf, page + i)
+                            for i in range(len(result.embeddings))
+                        ]
+                    page += len(result.embeddings)
+                    yield result
+        except httpx.TransportError:
+            ok = False
+            raise
+        finally:
+            # Score the endpoint on time to first response, not the whole stream
+            elapsed = time.monotonic() - start if elapsed is None else elapsed
+            self.endpoints.release(endpoint, ok, elapsed)
+
     def embed_images(self, images: list, mode: Mode = Mode.Standard) -> MidrasResponse:
         encoded_images = self.base64_encode_image_list(images)
 
-        response = self.client.post(
+        response = self._post(
             "/embed/images",
             json={"images": encoded_images},
-            headers={"Authorization": f"Bearer {self.api_key}"},
             params={"mode": mode},
         )
 
@@ -61,8 +203,10 @@ class Midras(BaseMidras):
         else:
             raise ValueError("Internal server error")
 
-    def create_index(self, name: str) -> bool:
-        return self.index.create_index(name)
+    def create_index(
+        self, name: str, profile: str | None = None, **overrides: Any
+    ) -> bool:
+        return self.index.create_index(name, profile, **overrides)
 
     def add_point(
         self, index: str, id: str | int, embedding: ColBERT, data: dict[str, Any]
@@ -71,13 +215,15 @@ class Midras(BaseMidras):
         return self.index.save_points(index, [point])
 
     def embed_queries(
-        self, queries: list[str], mode: Mode = Mode.Standard
+        self,
+        queries: list[str],
+        mode: Mode = Mode.Standard,
+        skip_special_tokens: bool = False,
     ) -> MidrasResponse:
-        response = self.client.post(
+        response = self._post(
             "/embed/queries",
             json={"queries": queries},
-            headers={"Authorization": f"Bearer {self.api_key}"},
-            params={"mode": mode},
+            params={"mode": mode, "skip_special_tokens": skip_special_tokens},
         )
 
         if response.status_code == 200:
@@ -85,9 +231,24 @@ class Midras(BaseMidras):
         else:
             raise ValueError("Internal server error")
 
-    def query(self, index: str, query: str, quantity: int = 5):
-        query_vector = self.embed_queries([query]).embeddings[0]
-        return self.index.search(index, query_vector, quantity)
+    def query(
+        self,
+        index: str | list[str],
+        query: str,
+        quantity: int = 5,
+        timeout: float | None = None,
+        prune_tokens: bool = False,
+        token_budget: int | None = None,
+    ):
+        prune_tokens = prune_tokens or token_budget is not None
+        query_vector = self.embed_queries(
+            [query], skip_special_tokens=prune_tokens
+        ).embeddings[0]
+        if token_budget is not None:
+            query_vector = prune_query(query_vector, token_budget)
+        if isinstance(index, str):
+            return self.index.search(index, query_vector, quantity)
+        return self.index.search_many(index, query_vector, quantity, timeout)
 
 
 class AsyncMidras(AsyncBaseMidras):
@@ -95,17 +256,87 @@ class AsyncMidras(AsyncBaseMidras):
         self,
         api_key: str,
         *,
-        vector_database: VectorDB | None = None,
-        base_url: str | None = None,
+        vector_database: VectorDB | AsyncVectorDB | None = None,
+        base_url: str | list[str] | None = None,
+        hedge_after: float | None = None,
+        failure_threshold: int = 3,
+        probe_interval: float = 10.0,
     ):
         self.api_key = api_key
-        self.client = httpx.AsyncClient(
-            base_url=CLOUD_URL if base_url is None else base_url
+        self.client = httpx.AsyncClient()
+        self.endpoints = EndpointPool(
+            endpoint_urls(base_url), failure_threshold, probe_interval
         )
-        self.index = vector_database if vector_database else Qdrant(location=":memory:")
+        self.hedge_after = hedge_after
+        self.index: VectorDB | AsyncVectorDB = (
+            vector_database if vector_database else Qdrant(location=":memory:")
+        )
+
+    async def _post(self, path: str, **kwargs: Any) -> httpx.Response:
+        tried: list[Endpoint] = []
+        while True:
+            endpoint = cast(Endpoint, self.endpoints.select(exclude=tried))
+            tried.append(endpoint)
+            try:
+                response = await self._hedge(endpoint, tried, path, kwargs)
+            except httpx.TransportError:
+                if len(tried) >= len(self.endpoints):
+                    raise
+                continue
+
+            if response.status_code < 500 or len(tried) >= len(self.endpoints):
+                return response
+
+    async def _hedge(
+        self, endpoint: Endpoint, tried: list[Endpoint], path: str, kwargs: dict
+    ) -> httpx.Response:
+        if self.hedge_after is None:
+            return await self._send(endpoint, path, kwargs)
+
+        primary = asyncio.ensure_future(self._send(endpoint, path, kwargs))
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_after)
+        backup_endpoint = None if done else self.endpoints.select(exclude=tried)
+        if backup_endpoint is None:
+            return await primary
+
+        tried.append(backup_endpoint)
+        backup = asyncio.ensure_future(self._send(backup_endpoint, path, kwargs))
+        done, pending = await asyncio.wait(
+            {primary, backup}, return_when=asyncio.FIRST_COMPLETED
+        )
+        first = done.pop()
+        if first.exception() is None and first.result().status_code < 500:
+            for task in pending:
+                task.cancel()
+            return first.result()
+        return await (backup if first is primary else primary)
+
+    async def _send(
+        self, endpoint: Endpoint, path: str, kwargs: dict
+    ) -> httpx.Response:
+        self.endpoints.acquire(endpoint)
+        start = time.monotonic()
+        ok = None
+        try:
+            response = await self.client.post(
+                f"{endpoint.url}{path}",
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                **kwargs,
+            )
+            ok = response.status_code < 500
+            return response
+        except httpx.TransportError:
+            ok = False
+            raise
+        finally:
+            self.endpoints.release(endpoint, ok, time.monotonic() - start)
 
     async def embed_pdf(
-        self, pdf: str | bytes, batch_size: int = 10, include_images: bool = False
+        self,
+        pdf: str | bytes,
+        batch_size: BatchSize = 10,
+        include_images: bool = False,
+        lazy_images: bool = False,
     ) -> MidrasResponse:
         if isinstance(pdf, str):
             with open(pdf, "rb") as f:
@@ -114,27 +345,89 @@ class AsyncMidras(AsyncBaseMidras):
             file_data = pdf
 
         files = {"file": ("test.pdf", file_data, "application/pdf")}
-        response = await self.client.post(
+        response = await self._post(
             "/embed/pdf",
             files=files,
-            headers={"Authorization": f"Bearer {self.api_key}"},
-            params={"batch_size": batch_size, "include_images": include_images},
+            params={
+                "batch_size": batch_size,
+                "include_images": include_images and not lazy_images,
+            },
         )
 
         if response.status_code == 200:
-            return MidrasResponse.model_validate(response.json())
+            result = MidrasResponse.model_validate(response.json())
+            if include_images and lazy_images:
+                result.images = [
+                    PageImage(pdf, page)
+                    for page in range(1, len(result.embeddings) + 1)
+                ]
+            return result
         else:
             raise ValueError("Internal server error")
 
+    async def iter_embed_pdf(
+        self,
+        pdf: str | bytes,
+        batch_size: BatchSize = 10,
+        include_images: bool = False,
+        lazy_images: bool = False,
+    ) -> AsyncIterator[MidrasResponse]:
+        if isinstance(pdf, str):
+            with open(pdf, "rb") as f:
+                file_data = f.read()
+        elif isinstance(pdf, bytes):
+            file_data = pdf
+
+        files = {"file": ("test.pdf", file_data, "application/pdf")}
+        endpoint = cast(Endpoint, self.endpoints.select())
+        self.endpoints.acquire(endpoint)
+        start = time.monotonic()
+        ok, elapsed = None, None
+        try:
+            async with self.client.stream(
+                "POST",
+                f"{endpoint.url}/embed/pdf",
+                files=files,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                params={
+                    "batch_size": batch_size,
+                    "include_images": include_images and not lazy_images,
+                    "stream": True,
+                },
+            ) as response:
+                ok = response.status_code < 500
+                elapsed = time.monotonic() - start
+                if response.status_code != 200:
+                    raise ValueError("Internal server error")
+
+                page = 1
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+
+                    result = MidrasResponse.model_validate_json(line)
+                    if include_images and lazy_images:
+                        result.images = [
+                            PageImage(pdf, page + i)
+                            for i in range(len(result.embeddings))
+                        ]
+                    page += len(result.embeddings)
+                    yield result
+        except httpx.TransportError:
+            ok = False
+            raise
+        finally:
+            elapsed = time.monotonic() - start if elapsed is None else elapsed
+            self.endpoints.release(endpoint, ok, elapsed)
+
     async def embed_images(
         self, images: list, mode: Mode = Mode.Standard
     ) -> MidrasResponse:
         encoded_images = self.base64_encode_image_list(images)
 
-        response = await self.client.post(
+        response = await self._post(
             "/embed/images",
             json={"images": encoded_images},
-            headers={"Authorization": f"Bearer {self.api_key}"},
             params={"mode": mode},
         )
 
@@ -143,23 +436,32 @@ class AsyncMidras(AsyncBaseMidras):
         else:
             raise ValueError("Internal server error")
 
-    async def create_index(self, name: str) -> bool:
-        return self.index.create_index(name)
+    async def create_index(
+        self, name: str, profile: str | None = None, **overrides: Any
+    ) -> bool:
+        if isinstance(self.index, AsyncVectorDB):
+            return await self.index.create_index(name, profile, **overrides)
+        return self.index.create_index(name, profile, **overrides)
 
     async def add_point(
         self, index: str, id: str | int, embedding: ColBERT, data: dict[str, Any]
     ):
+        if isinstance(self.index, AsyncVectorDB):
+            point = await self.index.create_point(id=id, embedding=embedding, data=data)
+            return await self.index.save_points(index, [point])
         point = self.index.create_point(id=id, embedding=embedding, data=data)
         return self.index.save_points(index, [point])
 
     async def embed_queries(
-        self, queries: list[str], mode: Mode = Mode.Standard
+        self,
+        queries: list[str],
+        mode: Mode = Mode.Standard,
+        skip_special_tokens: bool = False,
     ) -> MidrasResponse:
-        response = await self.client.post(
+        response = await self._post(
             "/embed/queries",
             json={"queries": queries},
-            headers={"Authorization": f"Bearer {self.api_key}"},
-            params={"mode": mode},
+            params={"mode": mode, "skip_special_tokens": skip_special_tokens},
         )
 
         if response.status_code == 200:
@@ -167,6 +469,31 @@ class AsyncMidras(AsyncBaseMidras):
         else:
             raise ValueError("Internal server error")
 
-    async def query(self, index: str, query: str, quantity: int = 5):
-        query_vector = (await self.embed_queries([query])).embeddings[0]
-        return self.index.search(index, query_vector, quantity)
+    async def query(
+        self,
+        index: str | list[str],
+        query: str,
+        quantity: int = 5,
+        timeout: float | None = None,
+        prune_tokens: bool = False,
+        token_budget: int | None = None,
+    ):
+        prune_tokens = prune_tokens or token_budget is not None
+        query_vector = (
+            await self.embed_queries([query], skip_special_tokens=prune_tokens)
+        ).embeddings[0]
+        if token_budget is not None:
+            query_vector = prune_query(query_vector, token_budget)
+        if isinstance(self.index, AsyncVectorDB):
+            if isinstance(index, str):
+                return await self.index.search(index, query_vector, quantity)
+            return await self.index.search_many(index, query_vector, quantity, timeout)
+
+        # Keep the event loop free while a sync backend searches
+        if isinstance(index, str):
+            return await asyncio.to_thread(
+                self.index.search, index, query_vector, quantity
+            )
+        return await asyncio.to_thread(
+            self.index.search_many, index, query_vector, quantity, timeout
+        )
@@ -0,0 +1,124 @@
+import time
+from threading import Lock
+from typing import Any, Callable, Iterator
+
+import torch
+
+from midrasai.types import ColBERT
+
+INITIAL_BATCH_SIZE = 2
+MAX_BATCH_SIZE = 64
+# Relative throughput gain required to keep doubling the batch size
+MIN_SPEEDUP = 1.05
+# Fraction of device memory a batch may peak at before growth stops
+MEMORY_CEILING = 0.85
+
+
+class BatchState:
+    def __init__(self, size: int):
+        self.size = size
+        self.best_size = size
+        self.best_throughput = 0.0
+        self.settled = False
+
+
+class AutoBatcher:
+    def __init__(
+        self,
+        device: torch.device | str,
+        initial_size: int = INITIAL_BATCH_SIZE,
+        max_size: int = MAX_BATCH_SIZE,
+        memory_ceiling: float = MEMORY_CEILING,
+    ):
+        self.device = torch.device(device)
+        self.initial_size = initial_size
+        self.max_size = max_size
+        self.memory_ceiling = memory_ceiling
+        self.states: dict[tuple[str, int], BatchState] = {}
+        # Forward passes run one at a time, so concurrent requests don't skew
+        # each other's timings and peak memory readings
+        self.lock = Lock()
+
+    def state(self, image: Any) -> BatchState:
+        return self.state_for(max(image.size))
+
+    def state_for(self, side: int) -> BatchState:
+        # Bucket pages by their longest side, rounded up to a power of two
+        key = (str(self.device), 1 << (side - 1).bit_length())
+        if key not in self.states:
+            self.states[key] = BatchState(self.initial_size)
+        return self.states[key]
+
+    def next_size(self, side: int) -> int:
+        with self.lock:
+            return self.state_for(side).size
+
+    def run(
+        self, images: list, forward: Callable[[list], list[ColBERT]]
+    ) -> Iterator[tuple[list, list[ColBERT]]]:
+        i = 0
+        while i < len(images):
+            with self.lock:
+                state = self.state(images[i])
+                batch = images[i : i + state.size]
+
+                try:
+                    embeddings, elapsed, peak = self.measure(forward, batch)
+                except Exception as e:
+                    if not is_out_of_memory(e) or len(batch) == 1:
+                        raise
+                    # Split the batch and retry it, never growing past this point
+                    self.release_memory()
+                    state.size = state.best_size = len(batch) // 2
+                    state.settled = True
+                    continue
+
+                self.update(state, len(batch), elapsed, peak)
+
+            yield batch, embeddings
+            i += len(batch)
+
+    def measure(
+        self, forward: Callable[[list], list[ColBERT]], batch: list
+    ) -> tuple[list[ColBERT], float, float]:
+        cuda = self.device.type == "cuda"
+        if cuda:
+            torch.cuda.synchronize(self.device)
+            torch.cuda.reset_peak_memory_stats(self.device)
+
+        start = time.perf_counter()
+        embeddings = forward(batch)
+        elapsed = time.perf_counter() - start
+
+        peak = 0.0
+        if cuda:
+            total = torch.cuda.get_device_properties(self.device).total_memory
+            peak = torch.cuda.max_memory_allocated(self.device) / total
+
+        return embeddings, elapsed, peak
+
+    def update(self, state: BatchState, size: int, elapsed: float, peak: float):
+        # Partial batches at the end of a document say nothing about the size
+        if state.settled or size < state.size:
+            return
+
+        throughput = size / max(elapsed, 1e-9)
+        if throughput > state.best_throughput * MIN_SPEEDUP:
+            state.best_throughput = throughput
+            state.best_size = size
+            if peak < self.memory_ceiling and size < self.max_size:
+                state.size = min(size * 2, self.max_size)
+                return
+
+        state.size = state.best_size
+        state.settled = True
+
+    def release_memory(self):
+        if self.device.type == "cuda":
+            torch.cuda.empty_cache()
+
+
+def is_out_of_memory(error: Exception) -> bool:
+    return isinstance(error, torch.cuda.OutOfMemoryError) or (
+        isinstance(error, RuntimeError) and "out of memory" in str(error)
+    )
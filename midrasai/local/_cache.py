@@ -0,0 +1,113 @@
+from collections import OrderedDict
+from concurrent.futures import Future
+from threading import Lock
+from typing import Callable, Hashable, TypeVar
+
+import numpy as np
+from pydantic import BaseModel
+
+from midrasai.types import ColBERT
+
+T = TypeVar("T")
+
+
+class CacheStats(BaseModel):
+    hits: int
+    misses: int
+    coalesced: int
+    size: int
+    bytes: int
+    max_bytes: int
+
+
+# LRU of recent embeddings. Identical inputs are embedded once: repeats inside a
+# request are deduplicated, and concurrent requests for an input that is already
+# being embedded wait for that result instead of running another forward pass.
+# Entries are float16 arrays (the model runs in bfloat16, so little is lost) and
+# the cache is bounded by their total size in bytes.
+class EmbeddingCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.entries: OrderedDict[Hashable, np.ndarray] = OrderedDict()
+        self.in_flight: dict[Hashable, Future[np.ndarray]] = {}
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get_or_compute(
+        self,
+        items: list[T],
+        key: Callable[[T], Hashable],
+        compute: Callable[[list[T]], list[ColBERT]],
+    ) -> list[ColBERT]:
+        keys = [key(item) for item in items]
+        results: dict[Hashable, np.ndarray] = {}
+        waiting: dict[Hashable, Future[np.ndarray]] = {}
+        owned: dict[Hashable, Future[np.ndarray]] = {}
+        pending: list[T] = []
+
+        with self.lock:
+            for k, item in zip(keys, items):
+                if k in results or k in waiting or k in owned:
+                    continue
+                if k in self.entries:
+                    self.entries.move_to_end(k)
+                    results[k] = self.entries[k]
+                    self.hits += 1
+                elif k in self.in_flight:
+                    waiting[k] = self.in_flight[k]
+                    self.coalesced += 1
+                else:
+                    owned[k] = self.in_flight[k] = Future()
+                    pending.append(item)
+                    self.misses += 1
+
+        if pending:
+            try:
+                embeddings = compute(pending)
+            except BaseException as e:
+                with self.lock:
+                    for k, future in owned.items():
+                        del self.in_flight[k]
+                        future.set_exception(e)
+                raise
+
+            with self.lock:
+                for (k, future), embedding in zip(owned.items(), embeddings):
+                    array = np.asarray(embedding, dtype=np.float16)
+                    del self.in_flight[k]
+                    self._store(k, array)
+                    future.set_result(array)
+                    results[k] = array
+
+        for k, future in waiting.items():
+            results[k] = future.result()
+
+        # Misses are served from the stored array too, so an input gets the
+        # same embedding whether it was cached or not
+        embeddings = {k: array.tolist() for k, array in results.items()}
+        return [embeddings[k] for k in keys]
+
+    def _store(self, key: Hashable, array: np.ndarray):
+        if array.nbytes > self.max_bytes:
+            return
+        if key in self.entries:
+            self.bytes -= self.entries.pop(key).nbytes
+        self.entries[key] = array
+        self.bytes += array.nbytes
+        while self.bytes > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.bytes -= evicted.nbytes
+
+    def stats(self) -> CacheStats:
+        with self.lock:
+            return CacheStats(
+                hits=self.hits,
+                misses=self.misses,
+                coalesced=self.coalesced,
+                size=len(self.entries),
+                bytes=self.bytes,
+                max_bytes=self.max_bytes,
+            )
@@ -0,0 +1,45 @@
+from contextlib import contextmanager
+from threading import Condition
+from typing import Iterator
+
+from pydantic import BaseModel
+
+
+class MemoryStats(BaseModel):
+    limit: int
+    in_use: int
+    waiting: int
+
+
+# Shared budget for decoded page images. Each request reserves the estimated
+# size of the pages it is about to rasterize and blocks while the budget is
+# exhausted, so a single large document can't take all the memory.
+class MemoryBudget:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_use = 0
+        self.waiting = 0
+        self.condition = Condition()
+
+    @contextmanager
+    def reserve(self, nbytes: int) -> Iterator[int]:
+        # Requests bigger than the whole budget run once they are alone
+        nbytes = min(nbytes, self.limit)
+        with self.condition:
+            self.waiting += 1
+            self.condition.wait_for(lambda: self.in_use + nbytes <= self.limit)
+            self.waiting -= 1
+            self.in_use += nbytes
+
+        try:
+            yield nbytes
+        finally:
+            with self.condition:
+                self.in_use -= nbytes
+                self.condition.notify_all()
+
+    def stats(self) -> MemoryStats:
+        with self.condition:
+            return MemoryStats(
+                limit=self.limit, in_use=self.in_use, waiting=self.waiting
+            )
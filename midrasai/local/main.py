@@ -1,13 +1,23 @@
-from typing import cast
+import os
+import re
+import tempfile
+from contextlib import contextmanager, nullcontext
+from typing import Iterator, cast
 
 import pdf2image
 import torch
 from colpali_engine import ColPali, ColPaliProcessor
 
 from midrasai._abc import BaseMidras, VectorDB
-from midrasai.types import MidrasResponse
+from midrasai._pruning import prune_query
+from midrasai.local._batching import AutoBatcher
+from midrasai.types import MidrasResponse, PageImage
 from midrasai.vectordb import Qdrant
 
+RASTER_DPI = 200
+# Pages decoded at once when the batch size is chosen automatically
+RASTER_CHUNK_PAGES = 16
+
 
 class LocalMidras(BaseMidras):
     def __init__(
@@ -26,52 +36,193 @@ class LocalMidras(BaseMidras):
             ColPaliProcessor,
             ColPaliProcessor.from_pretrained(model_name),
         )
+        self.batcher = AutoBatcher(self.model.device)
         self.index = vector_database if vector_database else Qdrant(location=":memory:")
 
-    def embed_pdf(self, pdf, batch_size=10, include_images=False) -> MidrasResponse:
-        if isinstance(pdf, str):
-            images = pdf2image.convert_from_path(pdf)
-        elif isinstance(pdf, bytes):
-            images = pdf2image.convert_from_bytes(pdf)
-        else:
-            raise ValueError("Invalid type")
-
+    def embed_pdf(
+        self,
+        pdf,
+        batch_size=10,
+        include_images=False,
+        lazy_images=False,
+        memory=None,
+    ) -> MidrasResponse:
         embeddings = []
+        images = []
 
-        for i in range(0, len(images), batch_size):
-            image_batch = images[i : i + batch_size]
-            response = self.embed_images(image_batch)
+        for response in self.iter_embed_pdf(
+            pdf, batch_size, include_images, lazy_images, memory
+        ):
             embeddings.extend(response.embeddings)
+            if response.images:
+                images.extend(response.images)
 
         return MidrasResponse(
             embeddings=embeddings,
             images=images if include_images else None,
         )
 
-    def embed_images(self, images, mode="local"):
+    def iter_embed_pdf(
+        self,
+        pdf,
+        batch_size=10,
+        include_images=False,
+        lazy_images=False,
+        memory=None,
+    ) -> Iterator[MidrasResponse]:
+        with pdf_path(pdf) as path:
+            info = pdf2image.pdfinfo_from_path(path)
+            page_count = info["Pages"]
+            width, height = estimate_page_pixels(info)
+            page_bytes = width * height * 3
+
+            # Rasterize one page range at a time so only the current chunk is decoded
+            first = 1
+            while first <= page_count:
+                if batch_size == "auto":
+                    # Decode at least a full batch, so the batcher keeps measuring
+                    # (and growing) sizes past RASTER_CHUNK_PAGES
+                    chunk_size = max(
+                        RASTER_CHUNK_PAGES, self.batcher.next_size(max(width, height))
+                    )
+                    if memory is not None:
+                        chunk_size = max(1, min(chunk_size, memory.limit // page_bytes))
+                else:
+                    chunk_size = batch_size
+                last = min(first + chunk_size - 1, page_count)
+                reservation = (
+                    memory.reserve(page_bytes * (last - first + 1))
+                    if memory is not None
+                    else nullcontext()
+                )
+                # Embed the whole chunk before yielding, so the reservation and
+                # decoded pages aren't held while a (streaming) consumer reads
+                responses = []
+                with reservation:
+                    images = pdf2image.convert_from_path(
+                        path, dpi=RASTER_DPI, first_page=first, last_page=last
+                    )
+                    page = first
+                    for image_batch, embeddings in self.iter_image_batches(
+                        images, batch_size
+                    ):
+                        if include_images and lazy_images:
+                            page_images = [
+                                PageImage.from_image(pdf, number, image)
+                                for number, image in enumerate(image_batch, page)
+                            ]
+                        elif include_images:
+                            page_images = image_batch
+                        else:
+                            page_images = None
+
+                        responses.append(
+                            MidrasResponse(embeddings=embeddings, images=page_images)
+                        )
+                        page += len(image_batch)
+                    del images
+
+                yield from responses
+                first = last + 1
+
+    def embed_images(self, images, mode="local", batch_size=None):
         _ = mode
+        if batch_size is None:
+            return MidrasResponse(embeddings=self.forward_images(images))
+
+        embeddings = []
+        for _, batch_embeddings in self.iter_image_batches(images, batch_size):
+            embeddings.extend(batch_embeddings)
+        return MidrasResponse(embeddings=embeddings)
+
+    def iter_image_batches(self, images, batch_size):
+        if batch_size == "auto":
+            yield from self.batcher.run(images, self.forward_images)
+            return
+
+        for i in range(0, len(images), batch_size):
+            image_batch = images[i : i + batch_size]
+            with self.batcher.lock:
+                image_embeddings = self.forward_images(image_batch)
+            yield image_batch, image_embeddings
+
+    def forward_images(self, images):
         batch_images = self.processor.process_images(images).to(self.model.device)
         with torch.no_grad():
             image_embeddings = self.model(**batch_images)
-        return MidrasResponse(embeddings=image_embeddings.tolist())
+        return image_embeddings.tolist()
 
-    def embed_queries(self, queries, mode="local"):
+    def embed_queries(self, queries, mode="local", skip_special_tokens=False):
         _ = mode
         batch_queries = self.processor.process_queries(queries).to(self.model.device)
         with torch.no_grad():
             query_embeddings = self.model(**batch_queries)
-        return MidrasResponse(embeddings=query_embeddings.tolist())
 
-    def create_index(self, name):
-        return self.index.create_index(name)
+        # Drop batch padding, so a query's embedding doesn't depend on the
+        # other queries it was batched with
+        keep = batch_queries["attention_mask"].bool()
+        if skip_special_tokens:
+            # Also drop the BOS and <pad> augmentation tokens
+            special_ids = torch.tensor(
+                self.processor.tokenizer.all_special_ids, device=self.model.device
+            )
+            keep &= ~torch.isin(batch_queries["input_ids"], special_ids)
+
+        return MidrasResponse(
+            embeddings=[
+                embedding[mask].tolist()
+                for embedding, mask in zip(query_embeddings, keep)
+            ]
+        )
+
+    def create_index(self, name, profile=None, **overrides):
+        return self.index.create_index(name, profile, **overrides)
 
     def add_point(self, index, id, embedding, data):
         point = self.index.create_point(id=id, embedding=embedding, data=data)
         return self.index.save_points(index, [point])
 
-    def query(self, index, query, quantity=5):
-        query_vector = self.embed_queries([query]).embeddings[0]
-        return self.index.search(index, query_vector, quantity)
+    def query(
+        self,
+        index,
+        query,
+        quantity=5,
+        timeout=None,
+        prune_tokens=False,
+        token_budget=None,
+    ):
+        prune_tokens = prune_tokens or token_budget is not None
+        query_vector = self.embed_queries(
+            [query], skip_special_tokens=prune_tokens
+        ).embeddings[0]
+        if token_budget is not None:
+            query_vector = prune_query(query_vector, token_budget)
+        if isinstance(index, str):
+            return self.index.search(index, query_vector, quantity)
+        return self.index.search_many(index, query_vector, quantity, timeout)
 
     def delete_index(self, name):
         return self.index.delete_index(name)
+
+
+@contextmanager
+def pdf_path(pdf: str | bytes) -> Iterator[str]:
+    if isinstance(pdf, str):
+        yield pdf
+        return
+    if not isinstance(pdf, bytes):
+        raise ValueError("Invalid type")
+
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+        f.write(pdf)
+    try:
+        yield f.name
+    finally:
+        os.remove(f.name)
+
+
+def estimate_page_pixels(info: dict) -> tuple[int, int]:
+    # pdfinfo reports the first page size, e.g. "612 x 792 pts (letter)"
+    match = re.match(r"([\d.]+) x ([\d.]+)", info.get("Page size", ""))
+    width, height = (float(v) for v in match.groups()) if match else (612.0, 792.0)
+    return int(width / 72 * RASTER_DPI), int(height / 72 * RASTER_DPI)
@@ -1,16 +1,36 @@
+import os
+import shutil
+import tempfile
 from base64 import b64decode
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
+from hashlib import sha256
 from io import BytesIO
-from typing import cast
+from typing import Iterator, cast
 
-from fastapi import FastAPI, File, UploadFile
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.responses import JSONResponse, StreamingResponse
 from PIL import Image
 from pydantic import BaseModel
+from starlette.background import BackgroundTask
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+from midrasai.local._cache import CacheStats, EmbeddingCache
+from midrasai.local._memory import MemoryBudget, MemoryStats
 from midrasai.local.main import LocalMidras
-from midrasai.types import MidrasResponse
+from midrasai.types import BatchSize, MidrasResponse
+
+QUERY_CACHE_BYTES = 64 * 1024**2
+IMAGE_CACHE_BYTES = 256 * 1024**2
+MAX_UPLOAD_BYTES = 256 * 1024**2
+PAGE_MEMORY_BYTES = 2 * 1024**3
+UPLOAD_CHUNK_BYTES = 1024**2
 
 midras = cast(LocalMidras, None)
+query_cache = EmbeddingCache(QUERY_CACHE_BYTES)
+image_cache = EmbeddingCache(IMAGE_CACHE_BYTES)
+max_upload_bytes = MAX_UPLOAD_BYTES
+page_memory = MemoryBudget(PAGE_MEMORY_BYTES)
 
 
 @asynccontextmanager
@@ -23,34 +43,153 @@ async def lifespan(_: FastAPI):
 app = FastAPI(lifespan=lifespan)
 
 
+class UploadTooLarge(HTTPException):
+    def __init__(self):
+        super().__init__(status_code=413, detail="Upload exceeds the size limit")
+
+
+# Counts body bytes as they are received, so uploads without a (truthful)
+# Content-Length are cut off at the limit instead of being spooled in full
+class LimitUploadSize:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length is not None and not content_length.isdigit():
+            response = JSONResponse(
+                status_code=400, content={"detail": "Invalid Content-Length header"}
+            )
+            return await response(scope, receive, send)
+        if content_length is not None and int(content_length) > max_upload_bytes:
+            response = JSONResponse(
+                status_code=413, content={"detail": "Upload exceeds the size limit"}
+            )
+            return await response(scope, receive, send)
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_upload_bytes:
+                    raise UploadTooLarge()
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+app.add_middleware(LimitUploadSize)
+
+
 class ImageInput(BaseModel):
     images: list[str]
 
     @property
     def pil_images(self):
-        return [
-            cast(Image.Image, Image.open(BytesIO(b64decode(image))))
-            for image in self.images
-        ]
+        return decode_images(self.images)
+
+
+def decode_images(images: list[str]) -> list[Image.Image]:
+    return [
+        cast(Image.Image, Image.open(BytesIO(b64decode(image)))) for image in images
+    ]
 
 
 class TextInput(BaseModel):
     queries: list[str]
 
 
+class CacheStatsResponse(BaseModel):
+    queries: CacheStats
+    images: CacheStats
+
+
 @app.post("/embed/queries")
-def embed_queries(input: TextInput) -> MidrasResponse:
-    query_embeddings = midras.embed_queries(input.queries)
-    return query_embeddings
+def embed_queries(
+    input: TextInput, skip_special_tokens: bool = False
+) -> MidrasResponse:
+    query_embeddings = query_cache.get_or_compute(
+        input.queries,
+        key=lambda query: (query, skip_special_tokens),
+        compute=lambda queries: (
+            midras.embed_queries(
+                queries, skip_special_tokens=skip_special_tokens
+            ).embeddings
+        ),
+    )
+    return MidrasResponse(embeddings=query_embeddings)
 
 
 @app.post("/embed/images")
 def embed_images(input: ImageInput) -> MidrasResponse:
-    image_embeddings = midras.embed_images(input.pil_images)
-    return image_embeddings
+    image_embeddings = image_cache.get_or_compute(
+        input.images,
+        key=lambda image: sha256(image.encode()).digest(),
+        compute=lambda images: (
+            midras.embed_images(decode_images(images), batch_size="auto").embeddings
+        ),
+    )
+    return MidrasResponse(embeddings=image_embeddings)
+
+
+@app.get("/health")
+def health() -> dict[str, str]:
+    return {"status": "ok"}
+
+
+@app.get("/memory/stats")
+def memory_stats() -> MemoryStats:
+    return page_memory.stats()
+
+
+@app.get("/cache/stats")
+def cache_stats() -> CacheStatsResponse:
+    return CacheStatsResponse(queries=query_cache.stats(), images=image_cache.stats())
+
+
+# pdf2image needs a named file, which the upload spooled by starlette is not
+def spool_upload(file: UploadFile) -> str:
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+        shutil.copyfileobj(file.file, f, UPLOAD_CHUNK_BYTES)
+    return f.name
+
+
+def remove_upload(path: str):
+    with suppress(FileNotFoundError):
+        os.remove(path)
+
+
+def stream_pdf(path: str, batch_size: BatchSize) -> Iterator[str]:
+    try:
+        for response in midras.iter_embed_pdf(path, batch_size, memory=page_memory):
+            yield response.model_dump_json() + "\n"
+    finally:
+        # Starlette skips the background task when the stream fails
+        remove_upload(path)
+
+
+@app.post("/embed/pdf", response_model=MidrasResponse)
+def embed_pdf(
+    file: UploadFile = File(...), batch_size: BatchSize = 10, stream: bool = False
+):
+    path = spool_upload(file)
 
+    if stream:
+        # The background task also runs when the client disconnects before the
+        # stream starts, unlike a finally block in the generator
+        return StreamingResponse(
+            stream_pdf(path, batch_size),
+            media_type="application/x-ndjson",
+            background=BackgroundTask(remove_upload, path),
+        )
 
-@app.post("/embed/pdf")
-def embed_pdf(file: UploadFile = File(...)) -> MidrasResponse:
-    image_embeddings = midras.embed_pdf(file.file.read())
-    return image_embeddings
+    try:
+        return midras.embed_pdf(path, batch_size, memory=page_memory)
+    finally:
+        remove_upload(path)
@@ -1,11 +1,19 @@
+from base64 import b64encode
 from enum import Enum
-from typing import Any, Dict, TypeAlias
+from functools import lru_cache
+from io import BytesIO
+from typing import Annotated, Any, Dict, Literal, TypeAlias
 
-from pydantic import BaseModel, ConfigDict
+import pdf2image
+from pydantic import BaseModel, ConfigDict, Field
 
 Embedding: TypeAlias = list[float]
 ColBERT: TypeAlias = list[Embedding]
 Base64Image: TypeAlias = str
+BatchSize: TypeAlias = Annotated[int, Field(ge=1)] | Literal["auto"]
+
+THUMBNAIL_SIZE = 256
+PAGE_CACHE_SIZE = 8
 
 
 class Mode(str, Enum):
@@ -21,6 +29,48 @@ class MidrasRequest(BaseModel):
     queries: list[str] | None = None
 
 
+class PageImage:
+    __slots__ = ("source", "page", "thumbnail")
+
+    def __init__(
+        self, source: str | bytes, page: int, thumbnail: Base64Image | None = None
+    ):
+        self.source = source
+        self.page = page
+        self.thumbnail = thumbnail
+
+    @classmethod
+    def from_image(
+        cls,
+        source: str | bytes,
+        page: int,
+        image: Any,
+        thumbnail_size: int = THUMBNAIL_SIZE,
+    ) -> "PageImage":
+        thumbnail = image.copy()
+        thumbnail.thumbnail((thumbnail_size, thumbnail_size))
+        with BytesIO() as buffer:
+            thumbnail.convert("RGB").save(buffer, format="JPEG")
+            encoded = b64encode(buffer.getvalue()).decode("utf-8")
+        return cls(source, page, encoded)
+
+    def load(self) -> Any:
+        return render_page(self.source, self.page)
+
+    def __repr__(self) -> str:
+        source = self.source if isinstance(self.source, str) else "<bytes>"
+        return f"PageImage(source={source!r}, page={self.page})"
+
+
+@lru_cache(maxsize=PAGE_CACHE_SIZE)
+def render_page(source: str | bytes, page: int) -> Any:
+    if isinstance(source, str):
+        images = pdf2image.convert_from_path(source, first_page=page, last_page=page)
+    else:
+        images = pdf2image.convert_from_bytes(source, first_page=page, last_page=page)
+    return images[0]
+
+
 class MidrasResponse(BaseModel):
     embeddings: list[ColBERT]
     images: list | None = None
@@ -32,3 +82,4 @@ class QueryResult(BaseModel):
     id: int | str
     score: float
     data: Dict[str, Any] | None
+    index: str | None = None
@@ -0,0 +1,113 @@
+import json
+import os
+from typing import Any, Iterator
+
+import numpy as np
+
+from midrasai.types import ColBERT
+
+# An exported index is a directory with:
+#   index.json     format version, token dimension and point count
+#   vectors.bin    float16 token matrix of every point, row-major, memory-mappable
+#   offsets.npy    int64 row offsets into vectors.bin, one more than the point count
+#   points.jsonl   id and payload of every point, in the same order
+ARCHIVE_VERSION = 1
+
+
+class ArchiveWriter:
+    def __init__(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        # Drop the metadata of a previous export first, so a failed re-export
+        # can't pair it with the new vectors.bin and points.jsonl
+        for name in ["index.json", "offsets.npy"]:
+            if os.path.exists(os.path.join(path, name)):
+                os.remove(os.path.join(path, name))
+        self.path = path
+        self.dim: int | None = None
+        self.offsets = [0]
+        self.vectors = open(os.path.join(path, "vectors.bin"), "wb")
+        self.points = open(os.path.join(path, "points.jsonl"), "w")
+
+    @property
+    def count(self) -> int:
+        return len(self.offsets) - 1
+
+    def write(self, id: int | str, embedding: ColBERT, data: dict[str, Any] | None):
+        matrix = np.asarray(embedding, dtype=np.float16)
+        if self.dim is None:
+            self.dim = matrix.shape[1]
+        elif matrix.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}-dimensional tokens for point {id}")
+
+        matrix.tofile(self.vectors)
+        self.offsets.append(self.offsets[-1] + matrix.shape[0])
+        self.points.write(json.dumps({"id": id, "data": data}) + "\n")
+
+    def close(self, complete: bool = True):
+        self.vectors.close()
+        self.points.close()
+        if not complete:
+            return
+
+        np.save(
+            os.path.join(self.path, "offsets.npy"), np.asarray(self.offsets, np.int64)
+        )
+        with open(os.path.join(self.path, "index.json"), "w") as f:
+            json.dump(
+                {
+                    "version": ARCHIVE_VERSION,
+                    "dim": self.dim or 128,
+                    "count": self.count,
+                },
+                f,
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *_):
+        # Leave out index.json on failure so a partial export can't be imported
+        self.close(complete=exc_type is None)
+
+
+class ArchiveReader:
+    def __init__(self, path: str):
+        with open(os.path.join(path, "index.json")) as f:
+            metadata = json.load(f)
+        if metadata["version"] != ARCHIVE_VERSION:
+            raise ValueError(f"Unsupported index archive version {metadata['version']}")
+
+        self.path = path
+        self.dim: int = metadata["dim"]
+        self.count: int = metadata["count"]
+        self.offsets = np.load(os.path.join(path, "offsets.npy"))
+        if len(self.offsets) != self.count + 1:
+            raise ValueError(f"Index archive at '{path}' is inconsistent")
+        if self.offsets[-1] == 0:
+            self.vectors = np.empty((0, self.dim), dtype=np.float16)
+        else:
+            self.vectors = np.memmap(
+                os.path.join(path, "vectors.bin"), dtype=np.float16, mode="r"
+            ).reshape(-1, self.dim)
+            if len(self.vectors) != self.offsets[-1]:
+                raise ValueError(f"Index archive at '{path}' is inconsistent")
+
+    def __len__(self) -> int:
+        return self.count
+
+    def batches(
+        self, batch_size: int
+    ) -> Iterator[list[tuple[int | str, ColBERT, dict[str, Any] | None]]]:
+        batch = []
+        with open(os.path.join(self.path, "points.jsonl")) as f:
+            for i, line in enumerate(f):
+                point = json.loads(line)
+                start, end = self.offsets[i], self.offsets[i + 1]
+                embedding = self.vectors[start:end].astype(np.float32).tolist()
+                batch.append((point["id"], embedding, point["data"]))
+
+                if len(batch) == batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
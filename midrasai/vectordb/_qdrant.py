@@ -1,9 +1,143 @@
+import asyncio
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from typing import Any, Awaitable, Callable, Dict, Optional, Union
 
+from pydantic import BaseModel, ConfigDict
 from qdrant_client import AsyncQdrantClient, QdrantClient, models
 
 from midrasai._abc import AsyncVectorDB, VectorDB
 from midrasai.types import ColBERT, QueryResult
+from midrasai.vectordb._archive import ArchiveReader, ArchiveWriter
+
+
+class IndexSettings(BaseModel):
+    on_disk: bool | None = None
+    on_disk_payload: bool | None = None
+    hnsw_m: int | None = None
+    hnsw_ef_construct: int | None = None
+    hnsw_on_disk: bool | None = None
+    memmap_threshold: int | None = None
+    indexing_threshold: int | None = None
+    default_segment_number: int | None = None
+    shard_number: int | None = None
+    replication_factor: int | None = None
+
+    model_config = ConfigDict(extra="forbid")
+
+
+INDEX_PROFILES: dict[str, dict[str, Any]] = {
+    # Everything in RAM, for small and frequently queried indexes
+    "memory": {
+        "on_disk": False,
+        "on_disk_payload": False,
+        "hnsw_m": 16,
+        "hnsw_ef_construct": 100,
+        "hnsw_on_disk": False,
+    },
+    # Vectors and graph in RAM, payloads on disk
+    "balanced": {
+        "on_disk": False,
+        "on_disk_payload": True,
+        "hnsw_m": 16,
+        "hnsw_ef_construct": 100,
+        "hnsw_on_disk": False,
+    },
+    # Memmapped vectors and payloads, no HNSW graph for the multivectors
+    "disk": {
+        "on_disk": True,
+        "on_disk_payload": True,
+        "hnsw_m": 0,
+        "memmap_threshold": 20000,
+        "indexing_threshold": 0,
+    },
+}
+
+
+def index_settings(profile: str | None, overrides: dict[str, Any]) -> IndexSettings:
+    if profile is None:
+        base = {}
+    elif profile in INDEX_PROFILES:
+        base = INDEX_PROFILES[profile]
+    else:
+        raise ValueError(
+            f"Unknown index profile '{profile}', expected one of {list(INDEX_PROFILES)}"
+        )
+    return IndexSettings(**{**base, **overrides})
+
+
+def hnsw_config(settings: IndexSettings) -> models.HnswConfigDiff | None:
+    if (
+        settings.hnsw_m is None
+        and settings.hnsw_ef_construct is None
+        and settings.hnsw_on_disk is None
+    ):
+        return None
+    return models.HnswConfigDiff(
+        m=settings.hnsw_m,
+        ef_construct=settings.hnsw_ef_construct,
+        on_disk=settings.hnsw_on_disk,
+    )
+
+
+def optimizers_config(settings: IndexSettings) -> models.OptimizersConfigDiff | None:
+    if (
+        settings.memmap_threshold is None
+        and settings.indexing_threshold is None
+        and settings.default_segment_number is None
+    ):
+        return None
+    return models.OptimizersConfigDiff(
+        memmap_threshold=settings.memmap_threshold,
+        indexing_threshold=settings.indexing_threshold,
+        default_segment_number=settings.default_segment_number,
+    )
+
+
+def create_index_params(settings: IndexSettings) -> dict[str, Any]:
+    return {
+        "vectors_config": models.VectorParams(
+            size=128,
+            distance=models.Distance.COSINE,
+            multivector_config=models.MultiVectorConfig(
+                comparator=models.MultiVectorComparator.MAX_SIM
+            ),
+            on_disk=settings.on_disk,
+        ),
+        "hnsw_config": hnsw_config(settings),
+        "optimizers_config": optimizers_config(settings),
+        "on_disk_payload": settings.on_disk_payload,
+        "shard_number": settings.shard_number,
+        "replication_factor": settings.replication_factor,
+    }
+
+
+def update_index_params(settings: IndexSettings) -> dict[str, Any]:
+    if settings.shard_number is not None:
+        raise ValueError("The shard number of an existing index cannot be changed")
+
+    vectors_config = None
+    if settings.on_disk is not None:
+        vectors_config = {"": models.VectorParamsDiff(on_disk=settings.on_disk)}
+
+    collection_params = None
+    if settings.on_disk_payload is not None or settings.replication_factor is not None:
+        collection_params = models.CollectionParamsDiff(
+            on_disk_payload=settings.on_disk_payload,
+            replication_factor=settings.replication_factor,
+        )
+
+    return {
+        "vectors_config": vectors_config,
+        "hnsw_config": hnsw_config(settings),
+        "optimizers_config": optimizers_config(settings),
+        "collection_params": collection_params,
+    }
+
+
+def search_params(hnsw_ef: int | None, exact: bool) -> models.SearchParams | None:
+    if hnsw_ef is None and not exact:
+        return None
+    return models.SearchParams(hnsw_ef=hnsw_ef, exact=exact)
 
 
 class Qdrant(VectorDB):
@@ -45,16 +179,20 @@ class Qdrant(VectorDB):
             **kwargs,
         )
 
-    def create_index(self, name: str) -> bool:
+    def create_index(
+        self, name: str, profile: str | None = None, **overrides: Any
+    ) -> bool:
+        settings = index_settings(profile, overrides)
         return self.client.create_collection(
-            collection_name=name,
-            vectors_config=models.VectorParams(
-                size=128,
-                distance=models.Distance.COSINE,
-                multivector_config=models.MultiVectorConfig(
-                    comparator=models.MultiVectorComparator.MAX_SIM
-                ),
-            ),
+            collection_name=name, **create_index_params(settings)
+        )
+
+    def update_index(
+        self, name: str, profile: str | None = None, **overrides: Any
+    ) -> bool:
+        settings = index_settings(profile, overrides)
+        return self.client.update_collection(
+            collection_name=name, **update_index_params(settings)
         )
 
     def create_point(
@@ -67,15 +205,77 @@ class Qdrant(VectorDB):
     ) -> models.UpdateResult:
         return self.client.upsert(index, points)
 
+    def index_exists(self, name: str) -> bool:
+        return self.client.collection_exists(name)
+
     def delete_index(self, name: str) -> bool:
         return self.client.delete_collection(collection_name=name)
 
+    def export_index(self, index: str, path: str, batch_size: int = 256) -> int:
+        offset = None
+        with ArchiveWriter(path) as archive:
+            while True:
+                points, offset = self.client.scroll(
+                    index,
+                    limit=batch_size,
+                    offset=offset,
+                    with_payload=True,
+                    with_vectors=True,
+                )
+                for point in points:
+                    archive.write(point.id, point.vector, point.payload)  # type: ignore
+                if offset is None:
+                    break
+        return archive.count
+
+    def import_index(
+        self,
+        index: str,
+        path: str,
+        batch_size: int = 256,
+        parallel: int = 4,
+        profile: str | None = None,
+        **overrides: Any,
+    ) -> int:
+        archive = ArchiveReader(path)
+        if not self.index_exists(index):
+            self.create_index(index, profile, **overrides)
+
+        imported = 0
+        with ThreadPoolExecutor(max_workers=parallel) as executor:
+            pending: dict[Future, int] = {}
+            for batch in archive.batches(batch_size):
+                if len(pending) >= parallel:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                        imported += pending.pop(future)
+
+                points = [self.create_point(*point) for point in batch]
+                pending[executor.submit(self.save_points, index, points)] = len(points)
+
+            for future, count in pending.items():
+                future.result()
+                imported += count
+
+        return imported
+
     def search(
-        self, index: str, query_vector: ColBERT, quantity: int
+        self,
+        index: str,
+        query_vector: ColBERT,
+        quantity: int,
+        hnsw_ef: int | None = None,
+        exact: bool = False,
     ) -> list[QueryResult]:
-        result = self.client.query_points(index, query=query_vector, limit=quantity)
+        result = self.client.query_points(
+            index,
+            query=query_vector,
+            limit=quantity,
+            search_params=search_params(hnsw_ef, exact),
+        )
         return [
-            QueryResult(id=point.id, score=point.score, data=point.payload)
+            QueryResult(id=point.id, score=point.score, data=point.payload, index=index)
             for point in result.points
         ]
 
@@ -119,16 +319,20 @@ class AsyncQdrant(AsyncVectorDB):
             **kwargs,
         )
 
-    async def create_index(self, name: str) -> bool:
+    async def create_index(
+        self, name: str, profile: str | None = None, **overrides: Any
+    ) -> bool:
+        settings = index_settings(profile, overrides)
         return await self.client.create_collection(
-            collection_name=name,
-            vectors_config=models.VectorParams(
-                size=128,
-                distance=models.Distance.COSINE,
-                multivector_config=models.MultiVectorConfig(
-                    comparator=models.MultiVectorComparator.MAX_SIM
-                ),
-            ),
+            collection_name=name, **create_index_params(settings)
+        )
+
+    async def update_index(
+        self, name: str, profile: str | None = None, **overrides: Any
+    ) -> bool:
+        settings = index_settings(profile, overrides)
+        return await self.client.update_collection(
+            collection_name=name, **update_index_params(settings)
         )
 
     async def create_point(
@@ -141,16 +345,76 @@ class AsyncQdrant(AsyncVectorDB):
     ) -> models.UpdateResult:
         return await self.client.upsert(index, points)
 
+    async def index_exists(self, name: str) -> bool:
+        return await self.client.collection_exists(name)
+
     async def delete_index(self, name: str) -> bool:
         return await self.client.delete_collection(collection_name=name)
 
+    async def export_index(self, index: str, path: str, batch_size: int = 256) -> int:
+        offset = None
+        with ArchiveWriter(path) as archive:
+            while True:
+                points, offset = await self.client.scroll(
+                    index,
+                    limit=batch_size,
+                    offset=offset,
+                    with_payload=True,
+                    with_vectors=True,
+                )
+                for point in points:
+                    archive.write(point.id, point.vector, point.payload)  # type: ignore
+                if offset is None:
+                    break
+        return archive.count
+
+    async def import_index(
+        self,
+        index: str,
+        path: str,
+        batch_size: int = 256,
+        parallel: int = 4,
+        profile: str | None = None,
+        **overrides: Any,
+    ) -> int:
+        archive = ArchiveReader(path)
+        if not await self.index_exists(index):
+            await self.create_index(index, profile, **overrides)
+
+        imported = 0
+        pending: dict[asyncio.Task, int] = {}
+        for batch in archive.batches(batch_size):
+            if len(pending) >= parallel:
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    task.result()
+                    imported += pending.pop(task)
+
+            points = [await self.create_point(*point) for point in batch]
+            pending[asyncio.create_task(self.save_points(index, points))] = len(points)
+
+        await asyncio.gather(*pending)
+        imported += sum(pending.values())
+
+        return imported
+
     async def search(
-        self, index: str, query_vector: ColBERT, quantity: int
+        self,
+        index: str,
+        query_vector: ColBERT,
+        quantity: int,
+        hnsw_ef: int | None = None,
+        exact: bool = False,
     ) -> list[QueryResult]:
         result = await self.client.query_points(
-            index, query=query_vector, quantity=quantity
+            index,
+            query=query_vector,
+            limit=quantity,
+            search_params=search_params(hnsw_ef, exact),
         )
         return [
-            QueryResult(id=point.id, score=point.score, data=point.payload)
+            QueryResult(id=point.id, score=point.score, data=point.payload, index=index)
             for point in result.points
         ]
@@ -0,0 +1,49 @@
+from midrasai.client._balancer import EndpointPool
+
+
+def test_select_least_loaded():
+    pool = EndpointPool(["http://a", "http://b"])
+    a, b = pool.endpoints
+
+    pool.acquire(a)
+    pool.release(a, True, 0.5)
+    pool.acquire(b)
+    pool.release(b, True, 0.1)
+    assert pool.select() is b
+
+    for _ in range(5):
+        pool.acquire(b)
+    assert pool.select() is a
+    assert pool.select(exclude=[a]) is b
+    assert pool.select(exclude=[a, b]) is None
+
+
+def test_eject_after_failures():
+    pool = EndpointPool(["http://a", "http://b"], failure_threshold=2)
+    a, b = pool.endpoints
+
+    for _ in range(2):
+        pool.acquire(a)
+        pool.release(a, False, 0.0)
+
+    assert a.ejected
+    assert pool.select() is b
+    # Ejected endpoints are still used when nothing else is left
+    assert pool.select(exclude=[b]) is a
+
+
+def test_probe_restores_endpoint(monkeypatch):
+    pool = EndpointPool(["http://a"], failure_threshold=1, probe_interval=0.01)
+    (a,) = pool.endpoints
+
+    class Response:
+        status_code = 200
+
+    monkeypatch.setattr("httpx.Client.get", lambda self, url: Response())
+
+    pool.acquire(a)
+    pool.release(a, False, 0.0)
+    assert a.ejected
+
+    pool.prober.join(timeout=5)  # type: ignore
+    assert not a.ejected
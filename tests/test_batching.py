@@ -0,0 +1,90 @@
+from types import SimpleNamespace
+
+import pytest
+
+from midrasai.local import _batching
+from midrasai.local._batching import AutoBatcher
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(_batching.time, "perf_counter", clock)
+    return clock
+
+
+def pages(count: int) -> list:
+    return [SimpleNamespace(size=(1700, 2200)) for _ in range(count)]
+
+
+def fake_forward(clock: FakeClock, cost, sizes: list[int], max_batch: int = 1024):
+    def forward(batch: list) -> list:
+        if len(batch) > max_batch:
+            raise RuntimeError("CUDA out of memory. Tried to allocate 2.00 GiB")
+        sizes.append(len(batch))
+        clock.now += cost(len(batch))
+        return [[[float(len(sizes))]] for _ in batch]
+
+    return forward
+
+
+def test_grows_while_throughput_improves(clock):
+    batcher = AutoBatcher("cpu", max_size=16)
+    sizes = []
+    # Fixed per-batch overhead: bigger batches are always faster per page
+    forward = fake_forward(clock, lambda size: 1.0 + 0.01 * size, sizes)
+
+    results = list(batcher.run(pages(62), forward))
+
+    assert sizes == [2, 4, 8, 16, 16, 16]
+    assert sum(len(batch) for batch, _ in results) == 62
+    state = batcher.state(pages(1)[0])
+    assert state.size == state.best_size == 16
+
+
+def test_settles_on_plateau(clock):
+    batcher = AutoBatcher("cpu")
+    sizes = []
+    # Throughput stops improving past 8 pages per batch
+    forward = fake_forward(clock, lambda size: max(size, 8) * 0.1, sizes)
+
+    list(batcher.run(pages(40), forward))
+
+    state = batcher.state(pages(1)[0])
+    assert state.settled
+    assert state.size == state.best_size == 8
+    assert sizes == [2, 4, 8, 16, 8, 2]
+
+
+def test_halves_and_retries_on_out_of_memory(clock):
+    batcher = AutoBatcher("cpu")
+    sizes = []
+    forward = fake_forward(clock, lambda size: 1.0, sizes, max_batch=5)
+
+    results = list(batcher.run(pages(20), forward))
+
+    # The batch of 8 ran out of memory and was retried as 4
+    assert sizes == [2, 4, 4, 4, 4, 2]
+    assert sum(len(batch) for batch, _ in results) == 20
+    state = batcher.state(pages(1)[0])
+    assert state.settled
+    assert state.size == 4
+
+
+def test_other_errors_are_raised(clock):
+    batcher = AutoBatcher("cpu")
+
+    def forward(batch):
+        raise ValueError("bad image")
+
+    with pytest.raises(ValueError):
+        list(batcher.run(pages(4), forward))
+    assert not batcher.lock.locked()
@@ -0,0 +1,34 @@
+from midrasai.local._cache import EmbeddingCache
+
+
+def embed(items: list[str]) -> list[list[list[float]]]:
+    return [[[len(item) / 3] * 128] * len(item) for item in items]
+
+
+def test_hit_matches_miss():
+    cache = EmbeddingCache(1024**2)
+
+    first = cache.get_or_compute(["abc", "abc"], key=str, compute=embed)
+    second = cache.get_or_compute(["abc"], key=str, compute=embed)
+
+    assert first[0] == first[1] == second[0]
+    stats = cache.stats()
+    assert (stats.hits, stats.misses) == (1, 1)
+    assert stats.bytes == 3 * 128 * 2
+
+
+def test_bounded_by_bytes():
+    # Room for two 3-token float16 embeddings
+    cache = EmbeddingCache(2 * 3 * 128 * 2)
+
+    cache.get_or_compute(["abc", "def", "ghi"], key=str, compute=embed)
+    stats = cache.stats()
+    assert stats.size == 2
+    assert stats.bytes <= stats.max_bytes
+
+    cache.get_or_compute(["abc"], key=str, compute=embed)
+    assert cache.stats().misses == 4
+
+    # Entries bigger than the whole cache are not stored
+    cache.get_or_compute(["x" * 10], key=str, compute=embed)
+    assert "x" * 10 not in cache.entries
@@ -0,0 +1,107 @@
+import time
+
+import pytest
+import typer
+
+from midrasai._ingest import find_pdfs, ingest
+from midrasai.cli import parse_batch_size
+from midrasai.types import MidrasResponse
+from midrasai.vectordb import Qdrant
+
+
+class FakeMidras:
+    def __init__(self):
+        self.index = Qdrant(":memory:")
+        self.index.create_index("test_index")
+        self.calls = []
+
+    def iter_embed_pdf(self, pdf, batch_size=10):
+        self.calls.append(pdf)
+        if pdf.endswith("broken.pdf"):
+            raise ValueError("Invalid pdf")
+        for _ in range(2):
+            yield MidrasResponse(embeddings=[[[1.0] * 128] * 3] * batch_size)
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    (tmp_path / "nested").mkdir()
+    for name in ["a.pdf", "b.PDF", "nested/c.pdf", "notes.txt", "broken.pdf"]:
+        (tmp_path / name).write_bytes(b"%PDF")
+    return tmp_path
+
+
+def test_find_pdfs(corpus):
+    paths = find_pdfs(str(corpus))
+    assert [p.rsplit("/", 1)[-1] for p in paths] == [
+        "a.pdf",
+        "b.PDF",
+        "broken.pdf",
+        "c.pdf",
+    ]
+
+    manifest = corpus / "manifest.txt"
+    manifest.write_text("# corpus\na.pdf\n\nnested/c.pdf\n")
+    assert find_pdfs(str(manifest)) == [
+        str(corpus / "a.pdf"),
+        str(corpus / "nested/c.pdf"),
+    ]
+
+
+def test_ingest_resume(corpus):
+    midras = FakeMidras()
+    paths = find_pdfs(str(corpus))
+    checkpoint = str(corpus / "checkpoint")
+
+    report = ingest(midras, paths, "test_index", checkpoint, workers=2, batch_size=2)
+    assert report.pages == 12
+    assert [f.path for f in report.failures] == [str(corpus / "broken.pdf")]
+    assert midras.index.client.count("test_index").count == 12
+
+    midras.calls.clear()
+    report = ingest(midras, paths, "test_index", checkpoint, workers=2, batch_size=2)
+    assert report.skipped == 3
+    assert midras.calls == [str(corpus / "broken.pdf")]
+    assert midras.index.client.count("test_index").count == 12
+
+
+def test_ingest_interrupted(tmp_path):
+    midras = FakeMidras()
+    paths = []
+    for i in range(8):
+        (tmp_path / f"{i}.pdf").write_bytes(b"%PDF")
+        paths.append(str(tmp_path / f"{i}.pdf"))
+    checkpoint = str(tmp_path / "checkpoint")
+
+    def slow_iter_embed_pdf(pdf, batch_size=10):
+        midras.calls.append(pdf)
+        time.sleep(0.05)
+        yield MidrasResponse(embeddings=[[[1.0] * 128]])
+
+    def interrupt(result):
+        raise KeyboardInterrupt
+
+    midras.iter_embed_pdf = slow_iter_embed_pdf
+    with pytest.raises(KeyboardInterrupt):
+        ingest(
+            midras, paths, "test_index", checkpoint, workers=2, on_document=interrupt
+        )
+
+    # Queued documents are cancelled and the ones that ran are checkpointed
+    with open(checkpoint) as f:
+        recorded = [line for line in f if line.strip()]
+    assert len(midras.calls) < len(paths)
+    assert len(recorded) == len(midras.calls)
+
+    midras.calls.clear()
+    ingest(midras, paths, "test_index", checkpoint, workers=2)
+    assert len(midras.calls) == len(paths) - len(recorded)
+
+
+def test_parse_batch_size():
+    assert parse_batch_size("auto") == "auto"
+    assert parse_batch_size("8") == 8
+
+    for batch_size in ["foo", "0", "-1"]:
+        with pytest.raises(typer.BadParameter):
+            parse_batch_size(batch_size)
@@ -1,8 +1,14 @@
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 from PIL import Image
 
+from midrasai._ingest import ingest
 from midrasai.local import Midras
-from midrasai.types import MidrasResponse, QueryResult
+from midrasai.local._memory import MemoryBudget
+from midrasai.types import MidrasResponse, PageImage, QueryResult
 
 
 @pytest.fixture(scope="module")
@@ -30,6 +36,22 @@ def test_embed_query(m: Midras, state):
     state["query"] = r.embeddings
 
 
+def test_embed_query_skip_special_tokens(m: Midras):
+    full = m.embed_queries(["hello"])
+    pruned = m.embed_queries(["hello"], skip_special_tokens=True)
+    assert 0 < len(pruned.embeddings[0]) < len(full.embeddings[0])
+
+
+def test_embed_query_independent_of_batch(m: Midras):
+    alone = m.embed_queries(["hello"]).embeddings[0]
+    batched = m.embed_queries(["hello", "a much longer query than hello"])
+
+    assert len(batched.embeddings[0]) == len(alone)
+    assert len(batched.embeddings[1]) > len(alone)
+    for a, b in zip(alone, batched.embeddings[0]):
+        assert a == pytest.approx(b, abs=1e-2)
+
+
 def test_embed_pdf_path(m: Midras, state):
     r = m.embed_pdf("./tests/assets/Attention_is_all_you_need.pdf", include_images=True)
     assert isinstance(r, MidrasResponse)
@@ -53,6 +75,60 @@ def test_embed_pdf_bytes(m: Midras, state):
     state["pdf"] = r.embeddings
 
 
+def test_embed_pdf_lazy_images(m: Midras):
+    r = m.embed_pdf(
+        "./tests/assets/Attention_is_all_you_need.pdf",
+        include_images=True,
+        lazy_images=True,
+    )
+    assert len(r.images) == 15  # type: ignore
+    for page, image in enumerate(r.images, start=1):  # type: ignore
+        assert isinstance(image, PageImage)
+        assert image.page == page
+        assert image.thumbnail is not None
+
+    assert r.images[0].load().size[0] > 0  # type: ignore
+
+
+def test_iter_embed_pdf(m: Midras):
+    responses = list(
+        m.iter_embed_pdf(
+            "./tests/assets/Attention_is_all_you_need.pdf",
+            batch_size=4,
+            include_images=True,
+        )
+    )
+    assert len(responses) == 4
+
+    for r in responses:
+        assert isinstance(r, MidrasResponse)
+        assert len(r.images) == len(r.embeddings)  # type: ignore
+
+    assert sum(len(r.embeddings) for r in responses) == 15
+
+
+def test_embed_pdf_auto_batch_size(m: Midras):
+    r = m.embed_pdf("./tests/assets/Attention_is_all_you_need.pdf", batch_size="auto")
+    assert len(r.embeddings) == 15
+    assert m.batcher.states
+
+
+def test_embed_images_auto_concurrent(m: Midras):
+    images = [
+        Image.open(open("./tests/assets/Colpali-example1.png", "rb")),  # type: ignore
+        Image.open(open("./tests/assets/Colpali-example2.png", "rb")),  # type: ignore
+        Image.open(open("./tests/assets/Colpali-example3.png", "rb")),  # type: ignore
+    ]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        responses = list(
+            executor.map(lambda _: m.embed_images(images, batch_size="auto"), range(4))
+        )
+
+    for r in responses:
+        assert len(r.embeddings) == 3
+    assert not m.batcher.lock.locked()
+
+
 def test_embed_images(m: Midras, state):
     r = m.embed_images(
         [
@@ -82,3 +158,61 @@ def test_query(m: Midras):
     for r in q:
         assert isinstance(r, QueryResult)
         assert r.data.get("test") == "midras"  # type: ignore
+
+
+def test_query_token_budget(m: Midras):
+    q = m.query("test_index", "whats a transformer", token_budget=4)
+
+    assert len(q) == 5
+    for r in q:
+        assert isinstance(r, QueryResult)
+
+
+def test_ingest_forward_passes_one_at_a_time(m: Midras, tmp_path, monkeypatch):
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"doc{i}.pdf"
+        shutil.copy("./tests/assets/Attention_is_all_you_need.pdf", path)
+        paths.append(str(path))
+
+    forward_images = m.forward_images
+    lock = threading.Lock()
+    active, overlaps = [0], [0]
+
+    def tracked(images):
+        with lock:
+            active[0] += 1
+            overlaps[0] += active[0] > 1
+        try:
+            return forward_images(images)
+        finally:
+            with lock:
+                active[0] -= 1
+
+    monkeypatch.setattr(m, "forward_images", tracked)
+    m.create_index("ingest_index")
+
+    report = ingest(
+        m,
+        paths,
+        "ingest_index",
+        str(tmp_path / "checkpoint"),
+        workers=3,
+        batch_size="auto",
+    )
+
+    assert report.pages == 45
+    assert overlaps[0] == 0
+
+
+def test_iter_embed_pdf_releases_memory_before_yield(m: Midras):
+    memory = MemoryBudget(1024**3)
+
+    pages = 0
+    for response in m.iter_embed_pdf(
+        "./tests/assets/Attention_is_all_you_need.pdf", batch_size=4, memory=memory
+    ):
+        assert memory.stats().in_use == 0
+        pages += len(response.embeddings)
+
+    assert pages == 15
@@ -1,8 +1,12 @@
+import asyncio
+import time
+
 import pytest
 from PIL import Image
 
-from midrasai import Midras
-from midrasai.types import MidrasResponse, QueryResult
+from midrasai import AsyncMidras, Midras
+from midrasai.types import MidrasResponse, PageImage, QueryResult
+from midrasai.vectordb import AsyncQdrant, Qdrant
 
 
 @pytest.fixture(scope="module")
@@ -53,6 +57,34 @@ def test_embed_pdf_bytes(m: Midras, state):
     state["pdf"] = r.embeddings
 
 
+def test_embed_pdf_lazy_images(m: Midras):
+    r = m.embed_pdf(
+        "./tests/assets/Attention_is_all_you_need.pdf",
+        include_images=True,
+        lazy_images=True,
+    )
+    assert len(r.images) == 15  # type: ignore
+    for page, image in enumerate(r.images, start=1):  # type: ignore
+        assert isinstance(image, PageImage)
+        assert image.page == page
+
+    assert r.images[0].load().size[0] > 0  # type: ignore
+
+
+def test_iter_embed_pdf(m: Midras):
+    responses = list(
+        m.iter_embed_pdf("./tests/assets/Attention_is_all_you_need.pdf", batch_size=4)
+    )
+    assert len(responses) == 4
+
+    for r in responses:
+        assert isinstance(r, MidrasResponse)
+        assert isinstance(r.embeddings[0], list)
+        assert isinstance(r.embeddings[0][0], list)
+
+    assert sum(len(r.embeddings) for r in responses) == 15
+
+
 def test_embed_images(m: Midras, state):
     images = [
         Image.open("./tests/assets/Colpali-example1.png"),
@@ -83,3 +115,57 @@ def test_query(m: Midras):
     for r in q:
         assert isinstance(r, QueryResult)
         assert r.data.get("test") == "midras"  # type: ignore
+
+
+async def fake_embed_queries(queries, mode=None, skip_special_tokens=False):
+    return MidrasResponse(embeddings=[[[1.0] * 128] for _ in queries])
+
+
+def test_async_query_async_backend(monkeypatch):
+    async def run():
+        m = AsyncMidras(api_key="test", vector_database=AsyncQdrant(":memory:"))
+        monkeypatch.setattr(m, "embed_queries", fake_embed_queries)
+        for index in ["shard_a", "shard_b"]:
+            await m.create_index(index)
+            await m.add_point(index, 1, [[1.0] * 128], {"shard": index})
+
+        single = await m.query("shard_a", "x")
+        fanned = await m.query(["shard_a", "shard_b"], "x", timeout=5)
+        return single, fanned
+
+    single, fanned = asyncio.run(run())
+    assert [r.index for r in single] == ["shard_a"]
+    assert sorted(r.index for r in fanned) == ["shard_a", "shard_b"]
+
+
+class SlowQdrant(Qdrant):
+    def search(self, index, query_vector, quantity, hnsw_ef=None, exact=False):
+        if index == "slow":
+            time.sleep(1)
+        return super().search(index, query_vector, quantity, hnsw_ef, exact)
+
+
+def test_async_query_sync_backend_timeout(monkeypatch):
+    async def ticker(ticks: list):
+        while True:
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.01)
+
+    async def run():
+        m = AsyncMidras(api_key="test", vector_database=SlowQdrant(":memory:"))
+        monkeypatch.setattr(m, "embed_queries", fake_embed_queries)
+        for index in ["fast", "slow"]:
+            await m.create_index(index)
+            await m.add_point(index, 1, [[1.0] * 128], {})
+
+        ticks: list[float] = []
+        task = asyncio.create_task(ticker(ticks))
+        with pytest.warns(UserWarning, match="'slow' timed out"):
+            results = await m.query(["fast", "slow"], "x", timeout=0.2)
+        task.cancel()
+        return results, ticks
+
+    results, ticks = asyncio.run(run())
+    assert [r.index for r in results] == ["fast"]
+    # The event loop kept running while the search waited on the slow shard
+    assert len(ticks) > 5
@@ -1,10 +1,12 @@
 import base64
 import io
+import json
 
 import pytest
 from fastapi.testclient import TestClient
 from PIL import Image
 
+from midrasai.local import server
 from midrasai.local.server import app
 
 
@@ -76,3 +78,125 @@ def test_embed_pdf(client: TestClient):
     for colbert in embeddings:
         assert isinstance(colbert, list)
         assert isinstance(colbert[0], list)
+
+
+def test_embed_pdf_stream(client: TestClient):
+    with open("./tests/assets/Attention_is_all_you_need.pdf", "rb") as f:
+        files = {"file": ("test.pdf", f, "application/pdf")}
+        r = client.post(
+            "/embed/pdf", files=files, params={"batch_size": 4, "stream": True}
+        )
+
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/x-ndjson"
+
+    records = [json.loads(line) for line in r.text.splitlines() if line]
+    assert len(records) == 4
+
+    embeddings = [colbert for record in records for colbert in record["embeddings"]]
+    assert len(embeddings) == 15
+
+    for colbert in embeddings:
+        assert isinstance(colbert, list)
+        assert isinstance(colbert[0], list)
+
+
+def test_embed_queries_cache(client: TestClient):
+    before = client.get("/cache/stats").json()["queries"]
+
+    queries = ["What is attention?", "What is attention?", "Who wrote it?"]
+    r = client.post("/embed/queries", json={"queries": queries})
+
+    assert r.status_code == 200
+
+    embeddings = r.json()["embeddings"]
+    assert len(embeddings) == 3
+    assert embeddings[0] == embeddings[1]
+
+    r = client.post("/embed/queries", json={"queries": ["Who wrote it?"]})
+    assert r.json()["embeddings"][0] == embeddings[2]
+
+    after = client.get("/cache/stats").json()["queries"]
+    assert after["misses"] - before["misses"] == 2
+    assert after["hits"] - before["hits"] == 1
+
+
+def test_embed_queries_skip_special_tokens(client: TestClient):
+    queries = ["What is attention?"]
+    full = client.post("/embed/queries", json={"queries": queries}).json()
+    r = client.post(
+        "/embed/queries",
+        json={"queries": queries},
+        params={"skip_special_tokens": True},
+    )
+
+    assert r.status_code == 200
+
+    pruned = r.json()["embeddings"]
+    assert 0 < len(pruned[0]) < len(full["embeddings"][0])
+
+
+def test_embed_pdf_upload_too_large(client: TestClient, monkeypatch):
+    monkeypatch.setattr(server, "max_upload_bytes", 1024)
+
+    with open("./tests/assets/Attention_is_all_you_need.pdf", "rb") as f:
+        files = {"file": ("test.pdf", f, "application/pdf")}
+        r = client.post("/embed/pdf", files=files)
+
+    assert r.status_code == 413
+
+
+def test_embed_pdf_chunked_upload_too_large(client: TestClient, monkeypatch):
+    monkeypatch.setattr(server, "max_upload_bytes", 1024)
+
+    def body():
+        with open("./tests/assets/Attention_is_all_you_need.pdf", "rb") as f:
+            while chunk := f.read(512):
+                yield chunk
+
+    r = client.post(
+        "/embed/pdf",
+        content=body(),
+        headers={"content-type": "multipart/form-data; boundary=midras"},
+    )
+
+    assert r.request.headers["transfer-encoding"] == "chunked"
+    assert r.status_code == 413
+
+
+def test_invalid_content_length(client: TestClient):
+    r = client.post(
+        "/embed/queries",
+        content=b"{}",
+        headers={"content-type": "application/json", "content-length": "many"},
+    )
+
+    assert r.status_code == 400
+
+
+def test_memory_stats(client: TestClient):
+    r = client.get("/memory/stats")
+
+    assert r.status_code == 200
+
+    stats = r.json()
+    assert stats["limit"] == server.PAGE_MEMORY_BYTES
+    assert stats["in_use"] == 0
+
+
+def test_cached_query_has_no_batch_padding(client: TestClient):
+    queries = ["Padding?", "A considerably longer query that pads the short one"]
+    batched = client.post("/embed/queries", json={"queries": queries}).json()
+    cached = client.post("/embed/queries", json={"queries": queries[:1]}).json()
+
+    assert cached["embeddings"][0] == batched["embeddings"][0]
+    assert len(cached["embeddings"][0]) < len(batched["embeddings"][1])
+
+
+@pytest.mark.parametrize("batch_size", [0, -1, "many"])
+def test_embed_pdf_invalid_batch_size(client: TestClient, batch_size):
+    with open("./tests/assets/Attention_is_all_you_need.pdf", "rb") as f:
+        files = {"file": ("test.pdf", f, "application/pdf")}
+        r = client.post("/embed/pdf", files=files, params={"batch_size": batch_size})
+
+    assert r.status_code == 422
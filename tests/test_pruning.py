@@ -0,0 +1,24 @@
+import pytest
+
+from midrasai._pruning import prune_query
+
+
+def test_prune_query_keeps_distinct_tokens():
+    filler = [[1.0, 0.0, 0.0]] * 6
+    content = [[0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]
+    embedding = [content[0], *filler[:3], content[1], *filler[3:]]
+
+    pruned = prune_query(embedding, 2)
+    assert pruned == content
+
+
+def test_prune_query_skips_zero_tokens():
+    embedding = [[0.0, 0.0], [1.0, 0.0], [0.0, 1.0], [0.0, 0.0]]
+
+    assert prune_query(embedding, 2) == [[1.0, 0.0], [0.0, 1.0]]
+    assert prune_query(embedding, 10) == embedding
+
+
+def test_prune_query_invalid_budget():
+    with pytest.raises(ValueError):
+        prune_query([[1.0, 0.0]], 0)
@@ -1,6 +1,10 @@
+import asyncio
+import time
+
 import pytest
+from qdrant_client import models
 
-from midrasai.vectordb import Qdrant
+from midrasai.vectordb import AsyncQdrant, Qdrant
 
 
 @pytest.fixture
@@ -11,3 +15,200 @@ def qdrant():
 def test_create_collection(qdrant: Qdrant):
     result = qdrant.create_index("test_index")
     assert result is True
+
+
+def test_search_many(qdrant: Qdrant):
+    for index, scale in [("shard_a", 1.0), ("shard_b", -1.0)]:
+        qdrant.create_index(index)
+        points = [
+            qdrant.create_point(
+                id=i, embedding=[[scale * (i + 1)] * 128] * 3, data={"shard": index}
+            )
+            for i in range(3)
+        ]
+        qdrant.save_points(index, points)
+
+    results = qdrant.search_many(["shard_a", "shard_b"], [[1.0] * 128] * 2, 4)
+
+    assert len(results) == 4
+    assert [r.score for r in results] == sorted(
+        (r.score for r in results), reverse=True
+    )
+    for r in results[:3]:
+        assert r.index == "shard_a"
+        assert r.data.get("shard") == "shard_a"  # type: ignore
+
+
+class SlowQdrant(Qdrant):
+    def search(self, index, query_vector, quantity, hnsw_ef=None, exact=False):
+        if index == "slow":
+            time.sleep(1)
+        return super().search(index, query_vector, quantity, hnsw_ef, exact)
+
+
+def test_search_many_empty(qdrant: Qdrant):
+    assert qdrant.search_many([], [[1.0] * 128], 3) == []
+
+
+def test_search_many_timeout():
+    qdrant = SlowQdrant(":memory:")
+    for index in ["fast", "slow"]:
+        qdrant.create_index(index)
+        qdrant.save_points(
+            index,
+            [qdrant.create_point(id=1, embedding=[[1.0] * 128], data={})],
+        )
+
+    start = time.perf_counter()
+    with pytest.warns(UserWarning, match="'slow' timed out"):
+        results = qdrant.search_many(["fast", "slow"], [[1.0] * 128], 3, timeout=0.2)
+
+    assert time.perf_counter() - start < 1
+    assert [r.index for r in results] == ["fast"]
+
+
+def test_search_many_shard_error(qdrant: Qdrant):
+    qdrant.create_index("test_index")
+    qdrant.save_points(
+        "test_index",
+        [qdrant.create_point(id=1, embedding=[[1.0] * 128], data={})],
+    )
+
+    with pytest.warns(UserWarning, match="'missing' failed"):
+        results = qdrant.search_many(["test_index", "missing"], [[1.0] * 128], 3)
+    assert [r.index for r in results] == ["test_index"]
+
+    with pytest.raises(ValueError):
+        qdrant.search_many(["missing"], [[1.0] * 128], 3)
+
+
+def test_async_search_many():
+    async def run():
+        qdrant = AsyncQdrant(":memory:")
+        for index in ["shard_a", "shard_b"]:
+            await qdrant.create_index(index)
+            point = await qdrant.create_point(
+                id=1, embedding=[[1.0] * 128], data={"shard": index}
+            )
+            await qdrant.save_points(index, [point])
+
+        assert await qdrant.search_many([], [[1.0] * 128], 3) == []
+        with pytest.warns(UserWarning, match="'missing' failed"):
+            return await qdrant.search_many(
+                ["shard_a", "shard_b", "missing"], [[1.0] * 128], 3, timeout=5
+            )
+
+    results = asyncio.run(run())
+    assert sorted(r.index for r in results) == ["shard_a", "shard_b"]
+
+
+@pytest.mark.parametrize("profile", ["memory", "balanced", "disk"])
+def test_create_index_profile(qdrant: Qdrant, profile: str):
+    result = qdrant.create_index("test_index", profile=profile)
+    assert result is True
+
+
+def test_create_index_overrides(qdrant: Qdrant):
+    qdrant.create_index("test_index", profile="memory", on_disk=True, hnsw_m=0)
+
+    params = qdrant.client.get_collection("test_index").config.params
+    assert params.vectors.on_disk is True  # type: ignore
+
+
+def test_create_index_invalid_settings(qdrant: Qdrant):
+    with pytest.raises(ValueError):
+        qdrant.create_index("test_index", profile="unknown")
+
+    with pytest.raises(ValueError):
+        qdrant.create_index("test_index", not_a_setting=True)
+
+
+def test_update_index_shard_number(qdrant: Qdrant):
+    qdrant.create_index("test_index")
+
+    with pytest.raises(ValueError):
+        qdrant.update_index("test_index", shard_number=2)
+
+
+def test_update_index_settings(qdrant: Qdrant, monkeypatch):
+    qdrant.create_index("test_index", profile="disk")
+
+    # Local mode ignores collection updates, so check what a server would get
+    calls = []
+    monkeypatch.setattr(
+        qdrant.client, "update_collection", lambda **kwargs: calls.append(kwargs)
+    )
+    qdrant.update_index("test_index", profile="balanced", hnsw_ef_construct=200)
+
+    assert calls == [
+        {
+            "collection_name": "test_index",
+            "vectors_config": {"": models.VectorParamsDiff(on_disk=False)},
+            "hnsw_config": models.HnswConfigDiff(m=16, ef_construct=200, on_disk=False),
+            "optimizers_config": None,
+            "collection_params": models.CollectionParamsDiff(on_disk_payload=True),
+        }
+    ]
+
+
+def test_search_exact(qdrant: Qdrant):
+    qdrant.create_index("test_index", profile="disk")
+    qdrant.save_points(
+        "test_index",
+        [qdrant.create_point(id=1, embedding=[[1.0] * 128], data={"test": "midras"})],
+    )
+
+    results = qdrant.search("test_index", [[1.0] * 128], 1, hnsw_ef=64, exact=True)
+    assert len(results) == 1
+    assert results[0].index == "test_index"
+
+
+def test_export_import_index(qdrant: Qdrant, tmp_path):
+    qdrant.create_index("test_index")
+    points = [
+        qdrant.create_point(
+            id=i, embedding=[[float(i + 1)] * 128] * (i + 1), data={"page": i}
+        )
+        for i in range(5)
+    ]
+    qdrant.save_points("test_index", points)
+
+    count = qdrant.export_index("test_index", str(tmp_path), batch_size=2)
+    assert count == 5
+
+    count = qdrant.import_index("copy_index", str(tmp_path), batch_size=2, parallel=2)
+    assert count == 5
+
+    records, _ = qdrant.client.scroll("copy_index", limit=10, with_vectors=True)
+    assert sorted(record.id for record in records) == list(range(5))  # type: ignore
+    for record in records:
+        assert record.payload == {"page": record.id}
+        assert len(record.vector) == record.id + 1  # type: ignore
+
+
+def test_failed_reexport_cannot_be_imported(qdrant: Qdrant, tmp_path, monkeypatch):
+    qdrant.create_index("test_index")
+    qdrant.save_points(
+        "test_index",
+        [
+            qdrant.create_point(id=i, embedding=[[1.0] * 128], data={})
+            for i in range(10)
+        ],
+    )
+    assert qdrant.export_index("test_index", str(tmp_path)) == 10
+
+    scroll = qdrant.client.scroll
+    calls = []
+
+    def failing_scroll(*args, **kwargs):
+        calls.append(1)
+        if len(calls) > 1:
+            raise ConnectionError("lost connection")
+        return scroll(*args, **kwargs)
+
+    monkeypatch.setattr(qdrant.client, "scroll", failing_scroll)
+    with pytest.raises(ConnectionError):
+        qdrant.export_index("test_index", str(tmp_path), batch_size=3)
+
+    with pytest.raises(FileNotFoundError):
+        qdrant.import_index("copy_index", str(tmp_path))